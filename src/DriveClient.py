@@ -0,0 +1,170 @@
+#std packages
+import os
+import pickle
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+#local packages
+import Metrics
+
+# gcloud api docs: https://developers.google.com/drive/api/v3/reference/files#resource
+# seed code: https://developers.google.com/drive/api/v3/quickstart/python?authuser=1
+
+# If modifying these scopes, delete the file token.pickle.
+SCOPES = ['https://www.googleapis.com/auth/drive.metadata.readonly']
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+
+#1000 is the max page size files.list allows
+PAGE_SIZE = 1000
+#only the metadata the standardize_gcloud_* methods read, which keeps each page response small
+PHOTO_FIELDS = 'nextPageToken, files(name, imageMediaMetadata(time, location))'
+#DriveSync also needs the ids and modified times to apply later changes
+SYNC_PHOTO_FIELDS = 'nextPageToken, files(id, name, modifiedTime, imageMediaMetadata(time, location))'
+
+#http statuses worth retrying, plus the 403 reasons drive uses for rate limits
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RATE_LIMIT_REASONS = (b'rateLimitExceeded', b'userRateLimitExceeded')
+MAX_RETRIES = 6
+BACKOFF_BASE = 1.0
+
+def get_drive_service(token_file='token.pickle', credentials_file='credentials.json'):
+
+    #imports for google gcloud drive. imported here since they are slow to load and only needed for drive runs
+    from googleapiclient.discovery import build
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from google.auth.transport.requests import Request
+
+    creds = None
+    # The file token.pickle stores the user's access and refresh tokens, and is
+    # created automatically when the authorization flow completes for the first
+    # time.
+    if os.path.exists(token_file):
+        with open(token_file, 'rb') as token:
+            creds = pickle.load(token)
+    # If there are no (valid) credentials available, let the user log in.
+    if not creds or not creds.valid:
+        if creds and creds.expired and creds.refresh_token:
+            creds.refresh(Request())
+        else:
+            flow = InstalledAppFlow.from_client_secrets_file(
+                credentials_file, SCOPES)
+            creds = flow.run_local_server(port=0)
+        # Save the credentials for the next run
+        with open(token_file, 'wb') as token:
+            pickle.dump(creds, token)
+
+    return build('drive', 'v3', credentials=creds)
+
+def is_retryable(error):
+
+    #duck typed so both googleapiclient HttpError and the FakeDrive errors are handled
+    resp = getattr(error, 'resp', None)
+    if resp is None:
+        return False
+    status = int(resp.status)
+    if status in RETRY_STATUSES:
+        return True
+    return status == 403 and any(reason in (getattr(error, 'content', None) or b'') for reason in RATE_LIMIT_REASONS)
+
+def execute_with_backoff(request, max_retries=MAX_RETRIES, backoff_base=None):
+
+    #exponential backoff with jitter, as recommended for drive rate limit errors
+    if backoff_base is None:
+        backoff_base = BACKOFF_BASE
+    for attempt in range(max_retries + 1):
+        try:
+            with Metrics.timer('drive_request'):
+                return request.execute()
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            Metrics.count('drive_retries')
+            delay = backoff_base * 2 ** attempt + random.uniform(0, backoff_base)
+            Metrics.warn(f'drive request failed with status {e.resp.status}, retrying in {round(delay,2)}s')
+            time.sleep(delay)
+
+#folder names resolved per files.list query, which keeps the query string well under drive's length limit
+FOLDER_QUERY_BATCH = 50
+
+def quote(name):
+    #escape a name for use inside a single quoted drive query string
+    return "'" + name.replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+def find_folder_ids(files, dir_list):
+
+    #resolves many folder names with one query per batch instead of one query per folder
+    folder_ids = {}
+    for start in range(0, len(dir_list), FOLDER_QUERY_BATCH):
+        dir_batch = dir_list[start:start + FOLDER_QUERY_BATCH]
+        request = files.list(q="mimeType = '" + FOLDER_MIME_TYPE + "' and (" +
+                               ' or '.join('name=' + quote(dir) for dir in dir_batch) + ")",
+                             pageSize=PAGE_SIZE,
+                             fields='nextPageToken, files(id, name)')
+        while request is not None:
+            folder_result = execute_with_backoff(request)
+            for folder in folder_result.get('files', []):
+                folder_ids.setdefault(folder['name'], []).append(folder['id'])
+            request = files.list_next(request, folder_result)
+
+    for dir in dir_list:
+        if len(folder_ids.get(dir, [])) == 0:
+            raise Exception("Folder not found: " + dir)
+        if len(folder_ids[dir]) > 1:
+            raise Exception("Multiple folders with the same name found (a unique name is needed): " + dir)
+    return {dir: folder_ids[dir][0] for dir in dir_list}
+
+def find_folder_id(files, dir):
+    return find_folder_ids(files, [dir])[dir]
+
+def iter_photo_pages(files, folder_id, page_size=PAGE_SIZE, fields=PHOTO_FIELDS):
+
+    #yields one list of file metadata per page. the next page is fetched in the background while the caller
+    #processes the current one. only one request is in flight at a time, since the http client isn't thread safe
+    request = files.list(q="mimeType != '" + FOLDER_MIME_TYPE + "'" \
+                           " and '" + folder_id + "' in parents",
+                         pageSize=page_size,
+                         fields=fields)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(execute_with_backoff, request)
+        while future is not None:
+            result = future.result()
+            request = files.list_next(request, result)
+            future = executor.submit(execute_with_backoff, request) if request is not None else None
+            Metrics.count('drive_pages_fetched')
+            yield result.get('files', [])
+
+class DriveSession:
+
+    #owns the credentials and the drive client for a batch of extractions, so token loading, refresh and
+    #client discovery happen once and every folder reuses the same http connection
+
+    def __init__(self, service=None, token_file='token.pickle', credentials_file='credentials.json'):
+
+        self.service = service if service is not None else get_drive_service(token_file, credentials_file)
+        self.folder_ids = {}
+
+    def resolve_folders(self, dir_list):
+
+        #only names not resolved earlier in the session are looked up
+        new_dir_list = [dir for dir in dict.fromkeys(dir_list) if dir not in self.folder_ids]
+        if new_dir_list:
+            self.folder_ids.update(find_folder_ids(self.service.files(), new_dir_list))
+        return {dir: self.folder_ids[dir] for dir in dir_list}
+
+    def folder_id(self, dir):
+        return self.resolve_folders([dir])[dir]
+
+    def extract_folders(self, dir_list, utc_zone, pe=None):
+
+        #returns {folder name: Track}. all names are resolved up front, so a typo fails before any listing starts.
+        #imported here since PointExtractor imports this module
+        import PointExtractor
+
+        if pe is None:
+            pe = PointExtractor.PointExtractor()
+        folder_ids = self.resolve_folders(dir_list)
+        return {dir: pe.get_points_gcloud(dir, utc_zone, service=self.service, folder_id=folder_ids[dir])
+                for dir in dir_list}
@@ -0,0 +1,144 @@
+#std packages
+import json
+import os
+import sqlite3
+
+#local packages
+import DriveClient
+import Metrics
+
+#mirror file is written next to where the local photo folder would be, e.g. clark_20200427-gcloud-cache.sqlite
+MIRROR_SUFFIX = '-gcloud-cache.sqlite'
+
+#changes feed fields: enough to tell whether a file is still a photo in the synced folder, plus its metadata
+CHANGE_FIELDS = 'nextPageToken, newStartPageToken, ' \
+                'changes(fileId, removed, file(name, parents, trashed, mimeType, modifiedTime, imageMediaMetadata(time, location)))'
+
+#version 1 stores the metadata column as json text. a mirror of another version drops its page token along with its
+#photos, so the next update lists the whole folder again rather than applying changes to a mirror it can't read
+SCHEMA_VERSION = 1
+
+class DriveSync:
+
+    #local mirror of the photo metadata in one drive folder. the first run lists the whole folder,
+    #later runs only apply what the drive changes feed reports since the saved page token.
+    #the imageMediaMetadata is kept as drive sends it and standardized on every run, so utc_zone can change freely
+
+    def __init__(self, dir, path=None):
+
+        self.dir = dir
+        self.path = path if path is not None else os.path.normpath(dir) + MIRROR_SUFFIX
+
+        self.conn = sqlite3.connect(self.path)
+        if self.conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+            self.conn.execute('DROP TABLE IF EXISTS photos')
+            self.conn.execute('DROP TABLE IF EXISTS state')
+            self.conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS photos ('
+                          ' id TEXT PRIMARY KEY,'
+                          ' name TEXT NOT NULL,'
+                          ' modified_time TEXT,'
+                          ' metadata TEXT NOT NULL)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS state ('
+                          ' key TEXT PRIMARY KEY,'
+                          ' value TEXT NOT NULL)')
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get_state(self, key):
+        row = self.conn.execute('SELECT value FROM state WHERE key = ?', (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def set_state(self, key, value):
+        self.conn.execute('INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)', (key, value))
+
+    def invalidate(self):
+
+        #forget everything, so the next update does a full listing
+        self.conn.execute('DELETE FROM photos')
+        self.conn.execute('DELETE FROM state')
+        self.conn.commit()
+
+    def upsert(self, photo):
+        self.conn.execute('INSERT OR REPLACE INTO photos (id, name, modified_time, metadata) VALUES (?, ?, ?, ?)',
+                          (photo['id'], photo['name'], photo.get('modifiedTime'), json.dumps(photo.get('imageMediaMetadata'))))
+
+    def remove(self, file_id):
+        return self.conn.execute('DELETE FROM photos WHERE id = ?', (file_id,)).rowcount
+
+    def full_sync(self, files, changes, folder_id=None):
+
+        #the start token is taken before listing, so changes made while listing are picked up next time
+        page_token = DriveClient.execute_with_backoff(changes.getStartPageToken())['startPageToken']
+        if folder_id is None:
+            folder_id = DriveClient.find_folder_id(files, self.dir)
+
+        self.conn.execute('DELETE FROM photos')
+        listed_ctr = 0
+        for photos in DriveClient.iter_photo_pages(files, folder_id, fields=DriveClient.SYNC_PHOTO_FIELDS):
+            for photo in photos:
+                self.upsert(photo)
+            listed_ctr += len(photos)
+
+        self.set_state('folder_id', folder_id)
+        self.set_state('page_token', page_token)
+        self.conn.commit()
+        Metrics.count('drive_full_syncs')
+        Metrics.count('drive_sync_files_updated', listed_ctr)
+
+    def incremental_sync(self, changes, folder_id, page_token):
+
+        updated_ctr = 0
+        removed_ctr = 0
+
+        request = changes.list(pageToken=page_token, pageSize=DriveClient.PAGE_SIZE, fields=CHANGE_FIELDS,
+                               includeRemoved=True, spaces='drive')
+        while True:
+            result = DriveClient.execute_with_backoff(request)
+            Metrics.count('drive_change_pages_fetched')
+
+            for change in result.get('changes', []):
+                photo = change.get('file')
+                #anything removed, trashed, moved out of the folder or turned into a folder is dropped from the mirror
+                if (change.get('removed') or photo is None or photo.get('trashed')
+                        or folder_id not in photo.get('parents', [])
+                        or photo.get('mimeType') == DriveClient.FOLDER_MIME_TYPE):
+                    removed_ctr += self.remove(change['fileId'])
+                    continue
+                photo['id'] = change['fileId']
+                self.upsert(photo)
+                updated_ctr += 1
+
+            if 'newStartPageToken' in result:
+                page_token = result['newStartPageToken']
+                break
+            request = changes.list(pageToken=result['nextPageToken'], pageSize=DriveClient.PAGE_SIZE, fields=CHANGE_FIELDS,
+                                   includeRemoved=True, spaces='drive')
+
+        self.set_state('page_token', page_token)
+        self.conn.commit()
+        Metrics.count('drive_incremental_syncs')
+        Metrics.count('drive_sync_files_updated', updated_ctr)
+        Metrics.count('drive_sync_files_removed', removed_ctr)
+
+    def update(self, service, folder_id=None):
+
+        #brings the mirror up to date and returns the folder's files in the shape files.list returns them.
+        #a known folder_id skips the name lookup. if it differs from the mirrored folder, the mirror is rebuilt
+        synced_folder_id = self.get_state('folder_id')
+        page_token = self.get_state('page_token')
+        if synced_folder_id is None or page_token is None or folder_id not in (None, synced_folder_id):
+            self.full_sync(service.files(), service.changes(), folder_id)
+        else:
+            self.incremental_sync(service.changes(), synced_folder_id, page_token)
+
+        return [{'id': file_id, 'name': name, 'imageMediaMetadata': json.loads(metadata)}
+                for file_id, name, metadata in self.conn.execute('SELECT id, name, metadata FROM photos ORDER BY name')]
+
+    def close(self):
+        self.conn.close()
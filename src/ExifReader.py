@@ -0,0 +1,152 @@
+#std packages
+import mmap
+import struct
+
+#From EXIF standards page: https://www.exiv2.org/tags.html
+EXIF_IFD_TAG = 34665 # pointer to the exif sub-IFD, which holds DateTimeOriginal
+GPS_IFD_TAG = 34853  # pointer to the GPS sub-IFD
+DATETIME_TAG = 36867 # datetime for image
+
+#JPEG markers
+JPEG_SOI = b'\xff\xd8'
+JPEG_APP1 = 0xE1
+JPEG_SOS = 0xDA
+JPEG_EOI = 0xD9
+EXIF_HEADER = b'Exif\x00\x00'
+
+#TIFF byte order marks
+TIFF_LE = b'II*\x00'
+TIFF_BE = b'MM\x00*'
+
+#TIFF field types: type id -> (struct code, size in bytes)
+BYTE, ASCII, SHORT, LONG, RATIONAL, SBYTE, UNDEFINED, SSHORT, SLONG, SRATIONAL = 1, 2, 3, 4, 5, 6, 7, 8, 9, 10
+TYPE_FORMATS = {
+    BYTE:      ('B', 1),
+    ASCII:     ('c', 1),
+    SHORT:     ('H', 2),
+    LONG:      ('L', 4),
+    RATIONAL:  ('LL', 8),
+    SBYTE:     ('b', 1),
+    UNDEFINED: ('c', 1),
+    SSHORT:    ('h', 2),
+    SLONG:     ('l', 4),
+    SRATIONAL: ('ll', 8),
+}
+
+#raised for files the header-only reader can't handle. callers should fall back to PIL
+class ExifFormatError(Exception):
+    pass
+
+def read_exif(path):
+
+    #reads DateTimeOriginal and the GPS IFD of a photo without decoding any image data
+    #returns a dict shaped like a trimmed PIL _getexif() result, {DATETIME_TAG: str, GPS_IFD_TAG: {tag: value}},
+    #or None if the photo has no exif data
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+        if magic[:2] == JPEG_SOI:
+            f.seek(2)
+            tiff = read_jpeg_app1(f)
+            if tiff is None:
+                return None
+            return parse_tiff(tiff)
+        if magic in (TIFF_LE, TIFF_BE):
+            #IFDs can sit anywhere in a TIFF, so map the file and let the OS page in only what is touched
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as tiff:
+                return parse_tiff(tiff)
+    raise ExifFormatError(f'unsupported photo format: {path}')
+
+def read_jpeg_app1(f):
+
+    #walk the segment headers up to the start of the image data, only reading the exif APP1 payload
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            raise ExifFormatError('corrupt JPEG segment marker')
+        #markers may be padded with any number of 0xFF fill bytes
+        while marker[1] == 0xFF:
+            marker = marker[1:] + f.read(1)
+            if len(marker) < 2:
+                raise ExifFormatError('truncated JPEG segment marker')
+        if marker[1] in (JPEG_SOS, JPEG_EOI):
+            return None
+
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            raise ExifFormatError('truncated JPEG segment')
+        length = struct.unpack('>H', length_bytes)[0] - 2
+
+        if marker[1] == JPEG_APP1:
+            header = f.read(len(EXIF_HEADER))
+            if header == EXIF_HEADER:
+                return f.read(length - len(EXIF_HEADER))
+            f.seek(length - len(header), 1)
+        else:
+            f.seek(length, 1)
+
+def parse_tiff(tiff):
+
+    byte_order = tiff[:4]
+    if byte_order == TIFF_LE:
+        endian = '<'
+    elif byte_order == TIFF_BE:
+        endian = '>'
+    else:
+        raise ExifFormatError('invalid TIFF header')
+
+    try:
+        ifd0_offset = struct.unpack_from(endian + 'L', tiff, 4)[0]
+        ifd0 = parse_ifd(tiff, ifd0_offset, endian, (EXIF_IFD_TAG, GPS_IFD_TAG))
+
+        exif_data = {}
+        if EXIF_IFD_TAG in ifd0:
+            exif_ifd = parse_ifd(tiff, ifd0[EXIF_IFD_TAG], endian, (DATETIME_TAG,))
+            if DATETIME_TAG in exif_ifd:
+                exif_data[DATETIME_TAG] = exif_ifd[DATETIME_TAG]
+        if GPS_IFD_TAG in ifd0:
+            exif_data[GPS_IFD_TAG] = parse_ifd(tiff, ifd0[GPS_IFD_TAG], endian)
+    except (struct.error, IndexError, ValueError) as e:
+        raise ExifFormatError(f'corrupt exif data: {e}')
+
+    return exif_data
+
+def parse_ifd(tiff, offset, endian, keep_tags=None):
+
+    #each IFD is a 2 byte entry count followed by 12 byte entries of (tag, type, count, value or offset)
+    n_entries = struct.unpack_from(endian + 'H', tiff, offset)[0]
+    ifd = {}
+    for entry_offset in range(offset + 2, offset + 2 + 12 * n_entries, 12):
+        tag, field_type, count = struct.unpack_from(endian + 'HHL', tiff, entry_offset)
+        if keep_tags is not None and tag not in keep_tags:
+            continue
+        if field_type not in TYPE_FORMATS:
+            continue
+
+        fmt, size = TYPE_FORMATS[field_type]
+        if size * count <= 4:
+            value_offset = entry_offset + 8
+        else:
+            value_offset = struct.unpack_from(endian + 'L', tiff, entry_offset + 8)[0]
+        data = bytes(tiff[value_offset:value_offset + size * count])
+        if len(data) < size * count:
+            raise ExifFormatError(f'truncated value for tag {tag}')
+
+        ifd[tag] = decode_value(data, field_type, count, endian)
+    return ifd
+
+def decode_value(data, field_type, count, endian):
+
+    #mirrors the legacy PIL _getexif() value shapes that the PointExtractor.standardize_exif_* methods expect
+    if field_type in (BYTE, UNDEFINED):
+        return data
+    if field_type == ASCII:
+        return data.split(b'\x00', 1)[0].decode('latin-1', 'replace')
+
+    fmt, size = TYPE_FORMATS[field_type]
+    values = struct.unpack(endian + fmt * count, data)
+    if field_type in (RATIONAL, SRATIONAL):
+        values = tuple(zip(values[0::2], values[1::2]))
+
+    if count == 1:
+        return values[0]
+    return values
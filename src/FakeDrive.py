@@ -0,0 +1,255 @@
+#std packages
+import argparse
+import datetime as dt
+import itertools
+import re
+import threading
+import time
+
+#local packages
+import DriveClient
+
+#in-process stand-in for the parts of the Drive v3 service that TrailDetective uses, so listing throughput,
+#paging and error handling can be exercised offline. pass a FakeDriveService wherever a service built with
+#googleapiclient.discovery.build('drive','v3') is accepted
+
+class FakeResponse:
+
+    def __init__(self, status):
+        self.status = status
+
+class FakeHttpError(Exception):
+
+    #mirrors the attributes of googleapiclient.errors.HttpError that DriveClient.is_retryable looks at
+    def __init__(self, status, content=b''):
+        super().__init__(f'fake http error {status}')
+        self.resp = FakeResponse(status)
+        self.content = content
+
+class FakeRequest:
+
+    def __init__(self, service, method, kwargs):
+        self.service = service
+        self.method = method
+        self.kwargs = kwargs
+
+    def execute(self):
+        return self.service.execute(self.method, self.kwargs)
+
+class FakeFiles:
+
+    def __init__(self, service):
+        self.service = service
+
+    def list(self, **kwargs):
+        return FakeRequest(self.service, 'files.list', kwargs)
+
+    def list_next(self, previous_request, previous_response):
+        page_token = previous_response.get('nextPageToken')
+        if page_token is None:
+            return None
+        return FakeRequest(self.service, 'files.list', dict(previous_request.kwargs, pageToken=page_token))
+
+class FakeChanges:
+
+    def __init__(self, service):
+        self.service = service
+
+    def getStartPageToken(self, **kwargs):
+        return FakeRequest(self.service, 'changes.getStartPageToken', kwargs)
+
+    def list(self, **kwargs):
+        return FakeRequest(self.service, 'changes.list', kwargs)
+
+class FakeDriveService:
+
+    def __init__(self, latency=0.0, error_every=0, error_status=429, error_content=b''):
+
+        #latency is slept per request. every error_every'th request fails once with error_status
+        self.latency = latency
+        self.error_every = error_every
+        self.error_status = error_status
+        self.error_content = error_content
+
+        self.items = {}
+        self.id_ctr = itertools.count(1)
+        self.lock = threading.Lock()
+
+        #change log backing the changes feed. a page token is an index into it
+        self.change_log = []
+        self.clock = dt.datetime(2020, 1, 1)
+
+        #request log, e.g. to check page counts and retries
+        self.request_ctr = 0
+        self.error_ctr = 0
+        self.max_page_size = 0
+
+    def files(self):
+        return FakeFiles(self)
+
+    def changes(self):
+        return FakeChanges(self)
+
+    def next_id(self):
+        return f'fake{next(self.id_ctr)}'
+
+    def touch(self, item):
+        #every write bumps the item's modifiedTime and lands in the changes feed
+        self.clock += dt.timedelta(seconds=1)
+        item['modifiedTime'] = self.clock.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        self.change_log.append(item['id'])
+
+    def add_folder(self, name, parent_id=None):
+        folder_id = self.next_id()
+        self.items[folder_id] = {'id': folder_id, 'name': name, 'mimeType': DriveClient.FOLDER_MIME_TYPE,
+                                 'parents': [parent_id] if parent_id else []}
+        self.touch(self.items[folder_id])
+        return folder_id
+
+    def add_file(self, folder_id, name, image_media_metadata=None, mime_type='image/jpeg'):
+        file_id = self.next_id()
+        item = {'id': file_id, 'name': name, 'mimeType': mime_type, 'parents': [folder_id], 'trashed': False}
+        if image_media_metadata is not None:
+            item['imageMediaMetadata'] = image_media_metadata
+        self.items[file_id] = item
+        self.touch(item)
+        return file_id
+
+    def update_file(self, file_id, **fields):
+        self.items[file_id].update(fields)
+        self.touch(self.items[file_id])
+
+    def trash_file(self, file_id):
+        self.update_file(file_id, trashed=True)
+
+    def delete_file(self, file_id):
+        #deleted files show up in the feed as removed, with no file resource
+        del self.items[file_id]
+        self.change_log.append(file_id)
+
+    def execute(self, method, kwargs):
+
+        with self.lock:
+            self.request_ctr += 1
+            fail = self.error_every and self.request_ctr % self.error_every == 0
+            if fail:
+                self.error_ctr += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise FakeHttpError(self.error_status, self.error_content)
+
+        if method == 'files.list':
+            return self.list_files(kwargs)
+        if method == 'changes.getStartPageToken':
+            return {'startPageToken': str(len(self.change_log))}
+        if method == 'changes.list':
+            return self.list_changes(kwargs)
+        raise Exception('Unsupported fake drive method: ' + method)
+
+    def list_files(self, kwargs):
+
+        page_size = kwargs.get('pageSize', 100)
+        self.max_page_size = max(self.max_page_size, page_size)
+        matches = [item for item in self.items.values()
+                   if not item.get('trashed') and matches_query(item, kwargs.get('q', ''))]
+
+        start = int(kwargs.get('pageToken') or 0)
+        result = {'files': matches[start:start + page_size]}
+        if start + page_size < len(matches):
+            result['nextPageToken'] = str(start + page_size)
+        return result
+
+    def list_changes(self, kwargs):
+
+        page_size = kwargs.get('pageSize', 100)
+        start = int(kwargs['pageToken'])
+        stop = min(start + page_size, len(self.change_log))
+
+        changes = []
+        for file_id in self.change_log[start:stop]:
+            item = self.items.get(file_id)
+            if item is None:
+                changes.append({'fileId': file_id, 'removed': True})
+            else:
+                changes.append({'fileId': file_id, 'removed': False, 'file': dict(item)})
+
+        result = {'changes': changes}
+        if stop < len(self.change_log):
+            result['nextPageToken'] = str(stop)
+        else:
+            result['newStartPageToken'] = str(stop)
+        return result
+
+#a single quoted query string, with \' and \\ escaped as DriveClient.quote does
+QUOTED_PATTERN = r"'((?:[^'\\]|\\.)*)'"
+
+def unquote(value):
+    return re.sub(r'\\(.)', r'\1', value)
+
+def matches_query(item, q):
+
+    #supports the subset of the drive query language TrailDetective sends:
+    #name='x' (or'd together), '<id>' in parents, and mimeType = / != checks
+    names = [unquote(name) for name in re.findall(r"name\s*=\s*" + QUOTED_PATTERN, q)]
+    if names and item['name'] not in names:
+        return False
+
+    parent = re.search(QUOTED_PATTERN + r" in parents", q)
+    if parent and unquote(parent.group(1)) not in item['parents']:
+        return False
+
+    for op, mime_type in re.findall(r"mimeType\s*(!?=)\s*" + QUOTED_PATTERN, q):
+        if (item['mimeType'] == unquote(mime_type)) != (op == '='):
+            return False
+
+    return True
+
+def make_photo_folder(service, name, n_photos, start=dt.datetime(2020, 4, 27, 8, 0, 0), lat=36.2, lon=-115.5, skip_every=10):
+
+    #adds a folder of synthetic photos walking north-east one step per minute. every skip_every'th photo has no location
+    folder_id = service.add_folder(name)
+    for i in range(n_photos):
+        metadata = {'time': (start + dt.timedelta(minutes=i)).strftime('%Y:%m:%d %H:%M:%S')}
+        if not skip_every or i % skip_every != skip_every - 1:
+            metadata['location'] = {'latitude': lat + i * 1e-4, 'longitude': lon + i * 1e-4, 'altitude': 1000.0 + i % 50}
+        service.add_file(folder_id, f'IMG_{i:06d}.jpg', metadata)
+    return folder_id
+
+if __name__ == '__main__':
+
+    #offline listing benchmark, e.g. python FakeDrive.py --photos 20000 --latency 0.2 --error_every 5 --sync
+    import PointExtractor
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--photos',      type=int,   default=20000, help='number of photos in the fake folder')
+    parser.add_argument('--latency',     type=float, default=0.2,   help='seconds slept per fake request')
+    parser.add_argument('--error_every', type=int,   default=0,     help='fail every n-th request with a 429')
+    parser.add_argument('--sync',        action='store_true',       help='also time an incremental DriveSync run after adding photos')
+    args = parser.parse_args()
+
+    DriveClient.BACKOFF_BASE = 0.01
+
+    service = FakeDriveService(latency=args.latency, error_every=args.error_every)
+    folder_id = make_photo_folder(service, 'fake_trip', args.photos)
+
+    def timed_run(label, sync=None):
+        request_ctr = service.request_ctr
+        start = time.time()
+        track = PointExtractor.PointExtractor().get_points_gcloud('fake_trip', 0, service=service, sync=sync)
+        elapsed = time.time() - start
+        print(f'{label}: points: {len(track)}, requests: {service.request_ctr - request_ctr}, ' \
+              f'injected errors: {service.error_ctr}, elapsed: {round(elapsed,2)}s')
+
+    timed_run('full listing')
+
+    if args.sync:
+        import tempfile
+        import DriveSync
+
+        with tempfile.TemporaryDirectory() as tmp_dir, DriveSync.DriveSync('fake_trip', path=tmp_dir + '/sync.sqlite') as sync:
+            timed_run('initial sync', sync)
+            for i in range(50):
+                service.add_file(folder_id, f'IMG_NEW_{i:03d}.jpg',
+                                 {'time': f'2020:04:28 08:{i:02d}:00', 'location': {'latitude': 36.0, 'longitude': -115.0, 'altitude': 900.0}})
+            timed_run('incremental sync', sync)
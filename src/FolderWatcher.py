@@ -0,0 +1,161 @@
+#std packages
+import os
+import time
+
+#local packages
+import GPXWriter
+import Metrics
+import PhotoCache
+import PointExtractor
+import Simplifier
+from Track import Track
+
+#keeps the GPX file of a local photo folder up to date while photos arrive, e.g. from a phone syncing into it.
+#the folder is polled rather than watched with inotify, which needs no extra dependency and works the same on
+#every platform and on network drives. bursts of new files are debounced: the GPX is only rewritten once the
+#folder listing has stayed the same for debounce seconds.
+#with append, new photos are added to the GPX file in place (see GPXWriter.append_gpx) instead of rewriting it,
+#which keeps updates of a long track cheap but lets readers see the file while it's being appended to
+
+#seconds between two listings of the folder
+DEFAULT_INTERVAL = 5
+#seconds the listing must stay unchanged before the GPX is updated
+DEFAULT_DEBOUNCE = 10
+
+class FolderWatcher:
+
+    def __init__(self, input_dir, utc_zone=0, interval=DEFAULT_INTERVAL, debounce=DEFAULT_DEBOUNCE, workers=1,
+                 pool=PointExtractor.THREAD, use_cache=True, compress=False, simplify=None, append=False):
+
+        if not os.path.isdir(input_dir):
+            raise Exception("Not a directory: " + input_dir)
+        #simplification looks at the whole track, so its output can't just be extended
+        if append and simplify is not None:
+            raise Exception('Cannot append to a simplified GPX file')
+
+        self.input_dir = input_dir
+        self.utc_zone = utc_zone
+        self.interval = interval
+        self.debounce = debounce
+        self.workers = workers
+        self.pool = pool
+        self.simplify = simplify
+        self.append = append
+        self.name = GPXWriter.gpx_name(GPXWriter.LOCAL, input_dir, compress)
+
+        self.pe = PointExtractor.PointExtractor()
+        #the cache stays open for the lifetime of the watcher, so a restart only re-reads photos that changed
+        self.cache = PhotoCache.PhotoCache(input_dir) if use_cache else None
+
+        #path -> (size, mtime_ns) of the photos in the current track
+        self.snapshot = {}
+        #a GPX file left by an earlier run may hold other photos, so the first update always rewrites it
+        self.is_written = False
+        self.track = Track.from_points([])
+        self.skipped_ctr = 0
+
+        #last listing seen and when it last changed, for the debounce
+        self.pending = None
+        self.pending_since = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.close()
+
+    def list_snapshot(self):
+
+        #photos that vanish between listing and stat, e.g. mid rename, are picked up by a later poll
+        snapshot = {}
+        for photo in self.pe.list_photos(self.input_dir):
+            try:
+                stat = os.stat(photo)
+            except FileNotFoundError:
+                continue
+            snapshot[photo] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def extract(self, photo_list, failed_list):
+
+        #returns (track, photos skipped), where photos that failed to read aren't counted as skipped
+        track, skipped_ctr = self.pe.get_points_photos(photo_list, self.utc_zone, self.workers, self.pool, self.cache,
+                                                       failed_list)
+        return track, skipped_ctr - len(failed_list)
+
+    def update(self, snapshot):
+
+        #only new photos are read and merged into the sorted track. a changed or removed photo can't be taken out
+        #of the track, so the track is rebuilt, which the cache keeps cheap
+        new_list = sorted(photo for photo in snapshot if photo not in self.snapshot)
+        is_rebuild = any(snapshot.get(photo) != stat for photo, stat in self.snapshot.items())
+
+        #photos that fail to read, e.g. ones still being copied, are left out of the snapshot so the next poll
+        #sees them as new and tries again
+        failed_list = []
+        if is_rebuild:
+            full_track, skipped_ctr = self.extract(sorted(snapshot), failed_list)
+        else:
+            new_track, skipped_ctr = self.extract(new_list, failed_list)
+            full_track = self.track.merge(new_track)
+            skipped_ctr += self.skipped_ctr
+
+        if self.append and self.is_written and not is_rebuild:
+            GPXWriter.append_gpx(self.name, new_track)
+        else:
+            track = full_track
+            if self.simplify is not None:
+                track = Simplifier.simplify_track(track, self.simplify)
+            GPXWriter.write_gpx(self.name, track)
+
+        #the state only moves on once the GPX is written, so a failed write is redone by the next poll
+        failed_set = set(failed_list)
+        self.snapshot = {photo: stat for photo, stat in snapshot.items() if photo not in failed_set}
+        self.track = full_track
+        self.skipped_ctr = skipped_ctr
+        self.is_written = True
+        if is_rebuild:
+            Metrics.count('watch_rebuilds')
+        else:
+            Metrics.count('watch_photos_added', len(new_list) - len(failed_list))
+        Metrics.count('watch_photos_failed', len(failed_list))
+        Metrics.count('watch_updates')
+
+        change = 'rebuilt from' if is_rebuild else f'{len(new_list) - len(failed_list)} new of'
+        print(f'{time.strftime("%H:%M:%S")} GPX file updated: {self.name} ({change} {len(self.snapshot)} photos, '
+              f'{len(self.track)} points, {self.skipped_ctr} photos skipped, {len(failed_list)} to retry)')
+
+    def poll(self):
+
+        #returns True if the GPX was updated
+        snapshot = self.list_snapshot()
+        now = time.monotonic()
+
+        if snapshot != self.pending:
+            self.pending = snapshot
+            self.pending_since = now
+        if snapshot == self.snapshot or now - self.pending_since < self.debounce:
+            return False
+
+        self.update(snapshot)
+        return True
+
+    def run(self):
+
+        #the photos already in the folder are written straight away, without waiting out the debounce
+        print(f'Watching <{self.input_dir}> every {self.interval}s, debounce {self.debounce}s')
+        self.pending = self.list_snapshot()
+        self.pending_since = time.monotonic() - self.debounce
+        while True:
+            #anything else that goes wrong, e.g. the GPX file being locked, is retried on the next poll since
+            #update only takes the snapshot once the GPX is written
+            try:
+                self.poll()
+            except Exception as e:
+                Metrics.warn(f'watch update failed ({type(e).__name__}: {e}), retrying in {self.interval}s')
+                Metrics.count('watch_errors')
+            time.sleep(self.interval)
@@ -1,12 +1,119 @@
 #std packages
 import argparse
+import gzip
+import io
+import os
+import re
+
+#installed packages
+import numpy as np
 
 #local packages
 import PointExtractor
+import PhotoCache
+import DriveClient
+import DriveSync
+import Metrics
+import Simplifier
+import Timestamps
+import Track
 
 LOCAL  = 'local'
 GCLOUD = 'gcloud'
 
+GPX_HEADER = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+              '<gpx creator="GPXWriter" version="1.1"\n'
+              '  xsi:schemaLocation="http://www.topografix.com/GPX/1/1 http://www.topografix.com/GPX/11.xsd"\n'
+              '  xmlns="http://www.topografix.com/GPX/1/1"\n'
+              '  xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">\n'
+              '  <trk>\n'
+              '    <trkseg>\n')
+
+GPX_TRAILER = ('    </trkseg>\n'
+               '  </trk>\n'
+               '</gpx>\n')
+
+GPX_SEGMENT_BREAK = ('    </trkseg>\n'
+                     '    <trkseg>\n')
+
+#points are formatted and written this many at a time, which bounds the size of each formatted chunk
+CHUNK_SIZE = 10000
+WRITE_BUFFER_SIZE = 1 << 20
+#bytes read back from the end of a gpx file to find its closing trkseg and last timestamp when appending
+TAIL_SIZE = 1 << 16
+GPX_TAIL_PATTERN = re.compile(rb'</trkseg>\s*</trk>\s*</gpx>\s*')
+GPX_TIME_PATTERN = re.compile(rb'<time>([^<]*)</time>')
+#the same, for the point text read back when merging
+GPX_POINT_TIME_PATTERN = re.compile(r'<time>([^<]*)</time>')
+
+def format_points(track, start, stop):
+    
+    #numpy formats whole columns at once. float32 columns print with their own shortest repr, e.g. 2202.52.
+    #missing values format as 'nan'/None and their line is left out
+    lat_list = track.lat[start:stop].astype(str).tolist()
+    lon_list = track.lon[start:stop].astype(str).tolist()
+    ele_list = ['' if ele == 'nan' else f'        <ele>{ele}</ele>\n'
+                for ele in track.ele[start:stop].astype(str).tolist()]
+    datetime_list = ['' if datetime is None else f'        <time>{datetime}</time>\n'
+                     for datetime in Timestamps.format_iso(track.time[start:stop])]
+    dilution_of_precision_list = ['' if dilution_of_precision == 'nan' else f'        <DOP>{dilution_of_precision}</DOP>\n'
+                                  for dilution_of_precision in track.dop[start:stop].astype(str).tolist()]
+    
+    return ''.join([f'      <trkpt lat="{lat}" lon="{lon}">\n{ele}{datetime}{dilution_of_precision}      </trkpt>\n'
+                    for lat, lon, ele, datetime, dilution_of_precision
+                    in zip(lat_list, lon_list, ele_list, datetime_list, dilution_of_precision_list)])
+
+def find_tail(name):
+    
+    #returns (byte offset of the line closing the file's last trkseg, time of its last point) of an uncompressed gpx
+    #file, seeking from the end instead of parsing the whole file. the file's points are taken to be sorted, as
+    #written by GPXWriter. the time is NAT if the file has no timed points, the offset None if the file doesn't end
+    #in a trkseg or the last point's time isn't within the bytes read
+    with open(name, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        tail_start = f.seek(max(0, size - TAIL_SIZE))
+        tail = f.read()
+    
+    trailer_pos = tail.rfind(b'</trkseg>')
+    if trailer_pos < 0 or GPX_TAIL_PATTERN.fullmatch(tail, trailer_pos) is None:
+        return None, Track.NAT
+    
+    #cut before the indentation of the closing tag, so the appended points line up
+    line_start = tail.rfind(b'\n', 0, trailer_pos) + 1
+    if tail[line_start:trailer_pos].strip():
+        line_start = trailer_pos
+    
+    time_list = GPX_TIME_PATTERN.findall(tail, 0, trailer_pos)
+    if len(time_list) == 0:
+        #fine for a small file without timed points, but a large one may have them before the tail
+        if tail_start > 0:
+            return None, Track.NAT
+        return line_start, Track.NAT
+    return tail_start + line_start, Timestamps.parse_iso([time_list[-1].decode()])[0]
+
+def write_tail(name, offset, tail):
+    
+    #replaces the bytes of the file from offset on with tail. the part of tail past the file's current end is written
+    #and synced first, and is cut off again if that fails, e.g. on a full disk. only then are the file's old closing
+    #tags overwritten, which needs no new space, so a failed append leaves the file as it was
+    with open(name, 'r+b') as f:
+        size = f.seek(0, os.SEEK_END)
+        overlap = size - offset
+        if len(tail) <= overlap:
+            f.seek(offset)
+            f.write(tail)
+            f.truncate()
+            return
+        try:
+            f.write(tail[overlap:])
+            f.flush()
+            os.fsync(f.fileno())
+        except:
+            f.truncate(size)
+            raise
+        f.seek(offset)
+        f.write(tail[:overlap])
+
 class GPXWriter:
 
     #######################################################################
@@ -14,19 +121,36 @@ class GPXWriter:
     #######################################################################
     
     ###### #1 #####       
-    def __init__(self, name):
+    def __init__(self, name, compress=None, append=False, tail=None):
         
         self.name = name
         
+        #gzip output is picked from the file name unless set explicitly
+        if compress is None:
+            compress = name.endswith('.gz')
+        
+        #append continues the last trkseg of an existing file. the new points are kept in memory and only replace
+        #the file's trailer in finalize, see write_tail. the caller checks that the new points sort after the
+        #file's, see append_gpx. tail is the file's find_tail result if the caller already has it
+        self.append_offset = None
+        if append:
+            if compress:
+                raise Exception('Cannot append in place to a compressed gpx file: ' + name)
+            offset, self.last_time = find_tail(name) if tail is None else tail
+            if offset is None:
+                raise Exception('Cannot find the end of the last track segment in gpx file: ' + name)
+            self.append_offset = offset
+            #newlines as a text mode file would write them
+            self.f = io.StringIO(newline=os.linesep)
+            return
+        
+        if compress:
+            self.f = gzip.open(self.name, 'wt', compresslevel=6)
+        else:
+            self.f = open(self.name, 'w', buffering=WRITE_BUFFER_SIZE)
+        
         #header formalities
-        self.f = open(self.name, "w+")
-        self.f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
-        self.f.write('<gpx creator="GPXWriter" version="1.1"\n')
-        self.f.write('  xsi:schemaLocation="http://www.topografix.com/GPX/1/1 http://www.topografix.com/GPX/11.xsd"\n')
-        self.f.write('  xmlns="http://www.topografix.com/GPX/1/1"\n')
-        self.f.write('  xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">\n')
-        self.f.write('  <trk>\n')
-        self.f.write('    <trkseg>\n')
+        self.f.write(GPX_HEADER)
 
     ###### #2 #####           
     def add_point(self, lat, lon, ele=None, datetime=None, dilution_of_precision=None):
@@ -43,42 +167,234 @@ class GPXWriter:
     ###### #2a #####           
     def add_point_list(self, point_list):
         
-        for point in point_list:
-            datetime, lat, lon ,ele, dilution_of_precision = point
-            self.add_point(lat,lon,ele,datetime,dilution_of_precision)
+        #point tuples may hold strings or numbers, the bulk path formats either
+        self.add_track(Track.Track.from_points(point_list))
+    
+    ###### #2b #####           
+    def add_track(self, track, chunk_size=CHUNK_SIZE):
+        
+        #each segment of the track after the first starts a new trkseg
+        segment_starts = track.segment_starts()
+        for i, (segment_start, segment_stop) in enumerate(zip(segment_starts[:-1], segment_starts[1:])):
+            if i > 0:
+                self.new_segment()
+            for start in range(segment_start, segment_stop, chunk_size):
+                self.f.write(format_points(track, start, min(start + chunk_size, segment_stop)))
+    
+    ###### #2c #####           
+    def new_segment(self):
+        
+        #closes the current trkseg, points added from here on go into a new one
+        self.f.write(GPX_SEGMENT_BREAK)
     
     ###### #3 #####               
     def finalize(self):
         
         #trailer formalities 
-        self.f.write('    </trkseg>\n')
-        self.f.write('  </trk>\n')
-        self.f.write('</gpx>\n')
+        self.f.write(GPX_TRAILER)
         
+        if self.append_offset is not None:
+            write_tail(self.name, self.append_offset, self.f.getvalue().encode())
         self.f.close()
 
 ##################################################################
 # This static method constructs the GPX file in one go
 ################################################################## 
         
-def make_gpx(dir_type,input_dir,utc_zone=0):
+def extract_track(dir_type,input_dir,utc_zone=0,workers=1,pool=PointExtractor.THREAD,use_cache=True,clear_cache=False,session=None):
     
-    pe = PointExtractor.PointExtractor(stringify=True)
-    point_list = []
+    pe = PointExtractor.PointExtractor()
     if dir_type == LOCAL:
-        point_list = pe.get_points_local(input_dir,utc_zone)
+        if use_cache:
+            with PhotoCache.PhotoCache(input_dir) as cache:
+                if clear_cache:
+                    cache.invalidate()
+                track = pe.get_points_local(input_dir,utc_zone,workers,pool,cache)
+        else:
+            track = pe.get_points_local(input_dir,utc_zone,workers,pool)
     elif dir_type == GCLOUD:
-        point_list = pe.get_points_gcloud(input_dir,utc_zone)
+        #a shared session reuses one authenticated client and its already resolved folder ids
+        if session is None:
+            session = DriveClient.DriveSession()
+        folder_id = session.folder_id(input_dir)
+        if use_cache:
+            with DriveSync.DriveSync(input_dir) as sync:
+                if clear_cache:
+                    sync.invalidate()
+                track = pe.get_points_gcloud(input_dir,utc_zone,session.service,sync,folder_id)
+        else:
+            track = pe.get_points_gcloud(input_dir,utc_zone,session.service,folder_id=folder_id)
     else:
         raise Exception("Invalid dir_type: " + dir_type)
+    
+    return track
 
+def gpx_name(dir_type,input_dir,compress=False):
     name = f'{input_dir}-{dir_type}.gpx'.lower()
+    if compress:
+        name += '.gz'
+    return name
+
+def write_gpx(name,track):
+    
+    #the track is written to a temporary file next to name and moved over it once complete, so readers of name,
+    #e.g. a map app watching it, see either the old or the new file and never a partial one
+    tmp_name = f'{name}.{os.getpid()}.tmp'
+    try:
+        with Metrics.timer('gpx_write', len(track)):
+            gpxw = GPXWriter(tmp_name, compress=name.endswith('.gz'))
+            gpxw.add_track(track)
+            gpxw.finalize()
+        os.replace(tmp_name, name)
+    except:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+
+def is_own_gpx(name):
+    
+    #files written by GPXWriter start with its exact header and hold nothing but its trkpt fields
+    opener = gzip.open if name.endswith('.gz') else open
+    with opener(name, 'rb') as f:
+        return f.read(len(GPX_HEADER)) == GPX_HEADER.encode()
+
+def iter_gpx_items(f, name, chunk_size=CHUNK_SIZE):
+    
+    #yields lists of (text, is_point, time string or None) items for the lines after the header of a gpx file written
+    #by GPXWriter, with the lines of each trkpt joined into one item. a list holds up to chunk_size points
+    for _ in range(GPX_HEADER.count('\n')):
+        f.readline()
     
-    gpxw = GPXWriter(name)
-    gpxw.add_point_list(point_list)
-    gpxw.finalize()
+    item_list = []
+    point_lines = None
+    point_ctr = 0
+    for line in f:
+        if point_lines is None:
+            if not line.lstrip().startswith('<trkpt'):
+                item_list.append((line, False, None))
+                continue
+            point_lines = []
+        point_lines.append(line)
+        
+        stripped = line.strip()
+        if stripped == '</trkpt>' or (len(point_lines) == 1 and stripped.endswith('/>')):
+            text = ''.join(point_lines)
+            match = GPX_POINT_TIME_PATTERN.search(text)
+            item_list.append((text, True, None if match is None else match.group(1)))
+            point_lines = None
+            point_ctr += 1
+            if point_ctr == chunk_size:
+                yield item_list
+                item_list = []
+                point_ctr = 0
+    
+    if point_lines is not None:
+        raise Exception('gpx file ends inside a trkpt: ' + name)
+    yield item_list
+
+def merge_gpx(name,track):
+    
+    #streams a gpx file written by GPXWriter and the sorted track into a new file in time order, a chunk of file
+    #points at a time, and moves it over name. new points are written before the segment breaks or trailer that
+    #follow the file point they sort after, so they continue its trkseg, and start a new trkseg wherever the
+    #track's own segment changes. file points without a time stay where they are
+    tmp_name = f'{name}.{os.getpid()}.tmp'
+    opener = gzip.open if name.endswith('.gz') else open
+    segment_starts = track.segment_starts()
+    new_idx = 0
+    new_segment = None
+    
+    def add_new_points(gpxw, stop):
+        nonlocal new_idx, new_segment
+        while new_idx < stop:
+            if new_segment is not None and track.segment[new_idx] != new_segment:
+                gpxw.new_segment()
+            segment_stop = min(stop, segment_starts[np.searchsorted(segment_starts, new_idx, side='right')])
+            for start in range(new_idx, segment_stop, CHUNK_SIZE):
+                gpxw.f.write(format_points(track, start, min(start + CHUNK_SIZE, segment_stop)))
+            new_segment = track.segment[new_idx]
+            new_idx = segment_stop
+    
+    try:
+        with Metrics.timer('gpx_merge', len(track)), opener(name, 'rt') as f:
+            gpxw = GPXWriter(tmp_name, compress=name.endswith('.gz'))
+            #lines between two file points, held back so new points can go before them
+            pending_list = []
+            for item_list in iter_gpx_items(f, name):
+                time_iter = iter(Timestamps.parse_iso([time for text, is_point, time in item_list if time is not None]))
+                for text, is_point, time in item_list:
+                    if not is_point:
+                        pending_list.append(text)
+                        continue
+                    #at equal times the file's points come first, like Track.merge
+                    if time is not None:
+                        add_new_points(gpxw, np.searchsorted(track.time, next(time_iter), side='left'))
+                    gpxw.f.write(''.join(pending_list))
+                    pending_list = []
+                    gpxw.f.write(text)
+            add_new_points(gpxw, len(track))
+            gpxw.f.write(''.join(pending_list))
+            gpxw.f.close()
+        os.replace(tmp_name, name)
+    except:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+
+def append_gpx(name,track):
+    
+    #adds the sorted track to a gpx file written by GPXWriter. when all new points sort after the file's last point
+    #they are written in place, at a cost proportional to the new points. otherwise, or for gzip files which can't be
+    #cut, the file is streamed through merge_gpx. either way new points continue the trkseg of the file point they
+    #follow and keep the track's own segment breaks. a missing file is simply written.
+    #other gpx files are refused: the tail search and the merge only know GPXWriter's layout, and the file may hold
+    #metadata, names, waypoints, extensions or sub-second times that new points would be written around wrongly
+    if not os.path.exists(name):
+        write_gpx(name,track)
+        return
+    if len(track) == 0:
+        return
+    if not is_own_gpx(name):
+        raise Exception('Cannot append to a gpx file not written by GPXWriter: ' + name)
+    
+    if not name.endswith('.gz'):
+        tail = find_tail(name)
+        offset, last_time = tail
+        if offset is not None and track.time[0] >= last_time:
+            with Metrics.timer('gpx_append', len(track)):
+                gpxw = GPXWriter(name, append=True, tail=tail)
+                gpxw.add_track(track)
+                gpxw.finalize()
+            return
+    
+    Metrics.count('gpx_merge_rewrites')
+    merge_gpx(name, track)
+
+def make_gpx(dir_type,input_dir,utc_zone=0,workers=1,pool=PointExtractor.THREAD,use_cache=True,clear_cache=False,compress=False,
+             session=None,simplify=None):
+    
+    track = extract_track(dir_type,input_dir,utc_zone,workers,pool,use_cache,clear_cache,session)
+
+    #optional simplification, simplify is the tolerance in metres
+    if simplify is not None:
+        track = Simplifier.simplify_track(track,simplify)
+
+    name = gpx_name(dir_type,input_dir,compress)
+    write_gpx(name,track)
     
     print('GPX file created:', name)  
+
+def make_gpx_batch(dir_type,input_dir_list,utc_zone=0,workers=1,pool=PointExtractor.THREAD,use_cache=True,clear_cache=False,compress=False,
+                   simplify=None):
+    
+    #one GPX file per folder. drive folders share one session and are all resolved in a single lookup up front
+    session = None
+    if dir_type == GCLOUD:
+        session = DriveClient.DriveSession()
+        session.resolve_folders(input_dir_list)
+    
+    for input_dir in input_dir_list:
+        make_gpx(dir_type,input_dir,utc_zone,workers,pool,use_cache,clear_cache,compress,session,simplify)
     
     
 if __name__ == '__main__':
@@ -87,19 +403,39 @@ if __name__ == '__main__':
     
     #local shortcut for local testing
     dir_type = LOCAL
-    input_dir = 'clark_20200427'
+    input_dir_list = ['clark_20200427']
     utc_zone = -4
+    workers = 1
+    pool = PointExtractor.THREAD
+    use_cache = True
+    clear_cache = False
+    compress = False
+    simplify = None
     
     if dir_type is None:
         parser = argparse.ArgumentParser()
         parser.add_argument('dir_type',    choices={LOCAL, GCLOUD}, help='type of storage directory: local or gcloud')
-        parser.add_argument('input_dir',                            help='input directory name')
+        parser.add_argument('input_dir',   nargs='+',               help='input directory name(s), one GPX file is written per directory')
         parser.add_argument('--utc_zone',  type=int, default=0,     help="UTC timezone as an int offset from GMT, e.g. 3 or -4")
+        parser.add_argument('--workers',   type=int, default=1,     help='number of parallel workers for reading local photos')
+        parser.add_argument('--pool',      choices={PointExtractor.THREAD, PointExtractor.PROCESS},
+                                           default=PointExtractor.THREAD, help='worker pool type for reading local photos')
+        parser.add_argument('--no_cache',    dest='use_cache', action='store_false', help='re-read every photo instead of using the local photo cache or drive mirror')
+        parser.add_argument('--clear_cache', action='store_true', help='invalidate the photo cache or drive mirror before extracting')
+        parser.add_argument('--gzip',        dest='compress', action='store_true', help='write a gzip compressed .gpx.gz file')
+        parser.add_argument('--simplify',    type=float, default=None, metavar='TOLERANCE',
+                                             help='drop points within this many metres of the simplified track (Douglas-Peucker)')
         
         args = parser.parse_args()
         
         dir_type  = args.dir_type
-        input_dir = args.input_dir
+        input_dir_list = args.input_dir
         utc_zone  = args.utc_zone
+        workers   = args.workers
+        pool      = args.pool
+        use_cache   = args.use_cache
+        clear_cache = args.clear_cache
+        compress    = args.compress
+        simplify    = args.simplify
             
-    make_gpx(dir_type, input_dir, utc_zone)
\ No newline at end of file
+    make_gpx_batch(dir_type, input_dir_list, utc_zone, workers, pool, use_cache, clear_cache, compress, simplify)
\ No newline at end of file
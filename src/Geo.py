@@ -0,0 +1,83 @@
+#installed packages
+import numpy as np
+
+#distance functions take scalars or numpy arrays (broadcast against each other) and return metres
+
+#avg earth radius used for haversine dist formula
+EARTH_RADIUS = 6371000
+
+# https://www.thoughtco.com/degree-of-latitude-and-longitude-distance-4070616
+DEG_LAT_DIST = 111 * 10**3
+
+#WGS-84 ellipsoid used for vincenty dist formula
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+
+def haversine_dist(lat1,lat2,lon1,lon2):
+
+    delta_lat = np.radians(lat2 - lat1)
+    delta_lon = np.radians(lon2 - lon1)
+    lat1 = np.radians(lat1)
+    lat2 = np.radians(lat2)
+
+    a = np.sin(delta_lat/2)**2 + np.cos(lat1)*np.cos(lat2)*np.sin(delta_lon/2)**2
+    c = 2*np.arcsin(np.sqrt(a))
+
+    return EARTH_RADIUS * c
+
+def vincenty_dist(lat1,lat2,lon1,lon2,max_itr=200,tol=1e-12):
+
+    #inverse vincenty formula on the WGS-84 ellipsoid: https://en.wikipedia.org/wiki/Vincenty%27s_formulae
+    #all points iterate together. the rare nearly antipodal pairs that don't converge keep their last estimate
+    lat1, lat2, lon1, lon2 = np.broadcast_arrays(*[np.asarray(x, dtype=np.float64) for x in (lat1, lat2, lon1, lon2)])
+
+    L = np.radians(lon2 - lon1)
+    U1 = np.arctan((1 - WGS84_F) * np.tan(np.radians(lat1)))
+    U2 = np.arctan((1 - WGS84_F) * np.tan(np.radians(lat2)))
+    sin_U1, cos_U1 = np.sin(U1), np.cos(U1)
+    sin_U2, cos_U2 = np.sin(U2), np.cos(U2)
+
+    lam = L
+    for _ in range(max_itr):
+        sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+        sin_sigma = np.sqrt((cos_U2 * sin_lam)**2 + (cos_U1 * sin_U2 - sin_U1 * cos_U2 * cos_lam)**2)
+        cos_sigma = sin_U1 * sin_U2 + cos_U1 * cos_U2 * cos_lam
+        sigma = np.arctan2(sin_sigma, cos_sigma)
+
+        #coincident points have sin_sigma == 0, guard the divisions and fix their distance to 0 at the end
+        safe_sin_sigma = np.where(sin_sigma == 0, 1, sin_sigma)
+        sin_alpha = cos_U1 * cos_U2 * sin_lam / safe_sin_sigma
+        cos2_alpha = 1 - sin_alpha**2
+        #points on the equator have cos2_alpha == 0
+        safe_cos2_alpha = np.where(cos2_alpha == 0, 1, cos2_alpha)
+        cos_2sigma_m = np.where(cos2_alpha == 0, 0, cos_sigma - 2 * sin_U1 * sin_U2 / safe_cos2_alpha)
+
+        C = WGS84_F / 16 * cos2_alpha * (4 + WGS84_F * (4 - 3 * cos2_alpha))
+        prev_lam = lam
+        lam = L + (1 - C) * WGS84_F * sin_alpha * (
+            sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m**2)))
+
+        if np.all(np.abs(lam - prev_lam) < tol):
+            break
+
+    u2 = cos2_alpha * (WGS84_A**2 - WGS84_B**2) / WGS84_B**2
+    A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+    B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+    delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (
+        cos_sigma * (-1 + 2 * cos_2sigma_m**2) - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma**2) * (-3 + 4 * cos_2sigma_m**2)))
+
+    dist = WGS84_B * A * (sigma - delta_sigma)
+    dist = np.where(sin_sigma == 0, 0.0, dist)
+    return dist if dist.ndim else float(dist)
+
+def get_lon_width(lat):
+    #length of one degree of longitude at the given latitude
+    return haversine_dist(lat,lat,0,1)
+
+def flat_sq_dist(lat1,lat2,lon1,lon2,deg_lon_dist):
+
+    #squared distance on a flat approximation with a fixed length per degree of longitude.
+    #fine over the extent of a single hike and cheaper than haversine
+    return (np.square((lat2 - lat1) * DEG_LAT_DIST) +
+            np.square((lon2 - lon1) * deg_lon_dist))
@@ -0,0 +1,119 @@
+#installed packages
+import numpy as np
+
+#local packages
+from Track import ELE, DOP
+
+#interpolation methods for lat/lon. ele and DOP are always linear in time
+LINEAR = 'linear'
+GEODESIC = 'geodesic'
+
+class Interpolator:
+
+    #answers position queries at arbitrary (also fractional) epoch seconds from the original points of a Track,
+    #via binary search, instead of resampling the whole track to 1 second.
+    #queries outside the track's time range return nan. points sharing a second are reduced to the first one,
+    #like resample('1S').first() did. a column gap is bridged between its valid neighbours. before a column's
+    #first valid value it stays nan and after its last it holds that value, as pandas' interpolate(method='time') does.
+    #queries between two segments of the track return nan too, nothing is interpolated across e.g. a night
+
+    def __init__(self, track, method=LINEAR):
+
+        if method not in (LINEAR, GEODESIC):
+            raise Exception('Unknown interpolation method: ' + method)
+        if len(track) == 0:
+            raise Exception('Cannot interpolate a track without points')
+
+        self.method = method
+        self.start = track.time[0]
+        self.end = track.time[-1]
+
+        #track is sorted, so the first index of each unique second is the first point of that second
+        self.time, first_idx = np.unique(track.time, return_index=True)
+        self.idx = first_idx
+        self.lat = track.lat[first_idx]
+        self.lon = track.lon[first_idx]
+
+        #ele/DOP keep their own valid points, so a missing value doesn't hide the points around it
+        self.cols = {}
+        for name, col in ((ELE, track.ele), (DOP, track.dop)):
+            valid = ~np.isnan(col)
+            col_time, col_first_idx = np.unique(track.time[valid], return_index=True)
+            self.cols[name] = (col_time, col[valid][col_first_idx].astype(np.float64))
+
+        #midpoints between neighbouring points for nearest lookups
+        self.time_bounds = (self.time[1:] + self.time[:-1]) / 2
+        
+        #(last second of a segment, first second of the next) for every segment boundary
+        segment = track.segment[first_idx]
+        boundary = np.flatnonzero(segment[1:] != segment[:-1])
+        self.gap_start = self.time[boundary]
+        self.gap_end = self.time[boundary + 1]
+
+    def in_range(self, times):
+        
+        in_range = (times >= self.start) & (times <= self.end)
+        if len(self.gap_start):
+            gap_idx = np.maximum(np.searchsorted(self.gap_start, times, side='right') - 1, 0)
+            in_range &= ~((times > self.gap_start[gap_idx]) & (times < self.gap_end[gap_idx]))
+        return in_range
+
+    def lat_lon(self, times):
+
+        times = np.asarray(times, dtype=np.float64)
+        in_range = self.in_range(times)
+
+        if self.method == LINEAR:
+            lat = np.interp(times, self.time, self.lat)
+            lon = np.interp(times, self.time, self.lon)
+        else:
+            lat, lon = self.slerp(times)
+
+        lat[~in_range] = np.nan
+        lon[~in_range] = np.nan
+        return lat, lon
+
+    def slerp(self, times):
+
+        #great circle interpolation between the bracketing points
+        right = np.clip(np.searchsorted(self.time, times, side='right'), 1, max(1, len(self.time) - 1))
+        left = right - 1
+        if len(self.time) == 1:
+            left = right = np.zeros_like(right)
+        span = (self.time[right] - self.time[left]).astype(np.float64)
+        frac = np.clip(np.divide(times - self.time[left], span, out=np.zeros_like(times), where=span > 0), 0, 1)
+
+        lat1, lon1 = np.radians(self.lat[left]), np.radians(self.lon[left])
+        lat2, lon2 = np.radians(self.lat[right]), np.radians(self.lon[right])
+        p1 = np.stack([np.cos(lat1) * np.cos(lon1), np.cos(lat1) * np.sin(lon1), np.sin(lat1)])
+        p2 = np.stack([np.cos(lat2) * np.cos(lon2), np.cos(lat2) * np.sin(lon2), np.sin(lat2)])
+
+        omega = np.arccos(np.clip(np.sum(p1 * p2, axis=0), -1, 1))
+        sin_omega = np.sin(omega)
+        #coincident neighbours fall back to linear weights, which are exact there
+        safe_sin_omega = np.where(sin_omega > 1e-12, sin_omega, 1)
+        w1 = np.where(sin_omega > 1e-12, np.sin((1 - frac) * omega) / safe_sin_omega, 1 - frac)
+        w2 = np.where(sin_omega > 1e-12, np.sin(frac * omega) / safe_sin_omega, frac)
+        p = w1 * p1 + w2 * p2
+
+        lat = np.degrees(np.arctan2(p[2], np.hypot(p[0], p[1])))
+        lon = np.degrees(np.arctan2(p[1], p[0]))
+        return lat, lon
+
+    def col(self, name, times):
+
+        times = np.asarray(times, dtype=np.float64)
+        col_time, col_values = self.cols[name]
+        if len(col_time) == 0:
+            return np.full(len(times), np.nan)
+        values = np.interp(times, col_time, col_values, left=np.nan)
+        values[~self.in_range(times)] = np.nan
+        return values
+
+    def nearest(self, times):
+
+        #index into the original track of the nearest point, ties go to the earlier point.
+        #-1 for queries outside the track's time range
+        times = np.asarray(times, dtype=np.float64)
+        nearest_idx = self.idx[np.searchsorted(self.time_bounds, times, side='left')]
+        return np.where(self.in_range(times), nearest_idx, -1)
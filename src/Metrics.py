@@ -0,0 +1,66 @@
+#std packages
+import json
+import time
+from contextlib import contextmanager
+
+#named stage timers and counters for the current run, e.g.
+#   with Metrics.timer('gpx_write', len(track)):
+#       ...
+#   Metrics.count('photos_skipped.no GPS data')
+#recording is silent and only costs a dict update. summary() returns everything recorded so far as a json
+#friendly dict, e.g. traildetective --metrics saves it at the end of a run.
+#only the current process is recorded, not e.g. the workers of a process pool
+
+#per item warnings, e.g. each skipped photo, are only printed in verbose mode. quiet runs just count them
+verbose = False
+
+#name -> (calls, seconds, items)
+timers = {}
+#name -> count
+counters = {}
+
+def reset():
+    timers.clear()
+    counters.clear()
+
+def count(name, n=1):
+    counters[name] = counters.get(name, 0) + n
+
+def add_time(name, seconds, items=0):
+
+    #items, e.g. the points written, gives the stage a throughput in the summary
+    calls, tot_seconds, tot_items = timers.get(name, (0, 0.0, 0))
+    timers[name] = (calls + 1, tot_seconds + seconds, tot_items + items)
+
+@contextmanager
+def timer(name, items=0):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_time(name, time.perf_counter() - start, items)
+
+def warn(message):
+    if verbose:
+        print('WARNING:', message)
+
+def summary():
+
+    timer_summary = {}
+    for name, (calls, seconds, items) in timers.items():
+        timer_summary[name] = {'calls': calls, 'seconds': round(seconds, 6)}
+        if items:
+            timer_summary[name]['items'] = items
+            timer_summary[name]['items_per_second'] = round(items / seconds, 2) if seconds > 0 else None
+
+    return {'timers': timer_summary, 'counters': dict(counters)}
+
+def save(path):
+
+    #'-' prints the summary instead
+    text = json.dumps(summary(), indent=2)
+    if path == '-':
+        print(text)
+    else:
+        with open(path, 'w') as f:
+            f.write(text + '\n')
@@ -0,0 +1,132 @@
+#std packages
+import json
+import os
+import sqlite3
+import time
+
+#local packages
+import Metrics
+
+#cache file is written next to the photo folder, e.g. clark_20200427-cache.sqlite
+CACHE_SUFFIX = '-cache.sqlite'
+MAX_ENTRIES = 100000
+
+#returned by lookup for photos that have to be re-read
+MISS = object()
+
+#version 1 moved the exif column from pickled blobs to json text. a cache file of another version is dropped and
+#its photos are read again, which costs one slow run but never a wrong point
+SCHEMA_VERSION = 1
+
+#the cache file sits next to the photos, where anyone sharing the folder can replace it, so the tags are stored as
+#json, which only ever decodes to data. rationals become [num, den] lists and bytes values, e.g. the GPS altitude
+#ref, become {"bytes": hex}. any other value keeps the photo out of the cache, see PhotoCache.store
+def encode_value(value):
+    if isinstance(value, bytes):
+        return {'bytes': value.hex()}
+    raise TypeError(f'exif value of type {type(value).__name__} can not be cached')
+
+def decode_value(value):
+
+    #back to the shapes the exif readers return: int tag keys, tuples and bytes
+    if isinstance(value, list):
+        return tuple(decode_value(item) for item in value)
+    if isinstance(value, dict):
+        if list(value) == ['bytes']:
+            return bytes.fromhex(value['bytes'])
+        return {int(tag): decode_value(item) for tag, item in value.items()}
+    return value
+
+def dumps_exif(exif_data):
+    return json.dumps(exif_data, default=encode_value)
+
+def loads_exif(text):
+    return decode_value(json.loads(text))
+
+class PhotoCache:
+
+    #stores the exif tags read from each photo, keyed by path and invalidated when the file size or mtime changes.
+    #standardization is cheap and depends on utc_zone/stringify, so it is re-run on cached tags rather than cached itself
+
+    def __init__(self, dir, max_entries=MAX_ENTRIES, path=None):
+
+        self.path = path if path is not None else os.path.normpath(dir) + CACHE_SUFFIX
+        self.max_entries = max_entries
+
+        self.conn = sqlite3.connect(self.path)
+        if self.conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+            self.conn.execute('DROP TABLE IF EXISTS photos')
+            self.conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS photos ('
+                          ' path TEXT PRIMARY KEY,'
+                          ' size INTEGER NOT NULL,'
+                          ' mtime_ns INTEGER NOT NULL,'
+                          ' exif TEXT NOT NULL,'
+                          ' last_used REAL NOT NULL)')
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def lookup(self, photo_list, stat_list):
+
+        #one query for the whole table is much cheaper than a query per photo on large folders
+        rows = {path: (size, mtime_ns, exif) for path, size, mtime_ns, exif in
+                self.conn.execute('SELECT path, size, mtime_ns, exif FROM photos')}
+
+        exif_list = []
+        hit_list = []
+        for photo, stat in zip(photo_list, stat_list):
+            row = rows.get(photo)
+            if row is None or row[0] != stat.st_size or row[1] != stat.st_mtime_ns:
+                exif_list.append(MISS)
+                continue
+            exif_list.append(loads_exif(row[2]))
+            hit_list.append(photo)
+
+        now = time.time()
+        self.conn.executemany('UPDATE photos SET last_used = ? WHERE path = ?', ((now, photo) for photo in hit_list))
+        self.conn.commit()
+        return exif_list
+
+    def store(self, photo_list, stat_list, exif_list):
+
+        #a photo whose tags can't be encoded, e.g. an unusual maker value, is left out and just read again next run
+        now = time.time()
+        row_list = []
+        for photo, stat, exif_data in zip(photo_list, stat_list, exif_list):
+            try:
+                row_list.append((photo, stat.st_size, stat.st_mtime_ns, dumps_exif(exif_data), now))
+            except (TypeError, ValueError) as e:
+                Metrics.warn(f'not caching exif of {photo}: {e}')
+                Metrics.count('photo_cache_unstorable')
+        self.conn.executemany('INSERT OR REPLACE INTO photos (path, size, mtime_ns, exif, last_used) VALUES (?, ?, ?, ?, ?)',
+                              row_list)
+        self.conn.commit()
+        self.prune()
+
+    def invalidate(self, photo_list=None):
+
+        #drop the given photos, or everything if no list is given
+        if photo_list is None:
+            self.conn.execute('DELETE FROM photos')
+        else:
+            self.conn.executemany('DELETE FROM photos WHERE path = ?', ((photo,) for photo in photo_list))
+        self.conn.commit()
+
+    def prune(self):
+
+        #keep only the most recently used entries once the size bound is exceeded
+        n_entries = self.conn.execute('SELECT COUNT(*) FROM photos').fetchone()[0]
+        if n_entries <= self.max_entries:
+            return
+        self.conn.execute('DELETE FROM photos WHERE path IN '
+                          '(SELECT path FROM photos ORDER BY last_used ASC LIMIT ?)',
+                          (n_entries - self.max_entries,))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -1,18 +1,22 @@
 #std packages
 import os
+import array
+import gzip
+import math
 import xml.etree.ElementTree as ET
 import re
-import datetime as dt
-import pandas as pd
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import numpy as np
 
-#installed packages
-import PIL.Image
-
-#imports for google gcloud drive
-import pickle
-from googleapiclient.discovery import build
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
+#local packages
+import DriveClient
+import ExifReader
+import Metrics
+import PhotoCache
+import Timestamps
+import TrackCache
+from Track import Track, NAT
 
 #From EXIF standards page: https://www.exiv2.org/tags.html
 GPS_GROUP_TAG = 34853
@@ -35,19 +39,39 @@ GPS_SPEED_TAG = 13 #missing
 GPS_MAP_TAG = 18 #missing
 DATE_TAG = 29 # datetime for GPS data
 
+#worker pool types for parallel photo reads
+THREAD = 'thread'
+PROCESS = 'process'
+
 #list of valid file extensions for photos
 EXT_LIST = ('jpg','jpeg','gif','png','tiff','raw')
 
-LAT = 'lat'
-LON = 'lon'
-ELE = 'ele'
-DATETIME = 'datetime'
-DOP = 'DOP'
+def rationals_to_tuples(value):
+    
+    #PIL returns exif rationals as IFDRational objects, ExifReader (and older PIL) as (num, den) tuples.
+    #converts the rationals in nested dicts/tuples of PIL values to tuples, so both readers return the same shape
+    from PIL.TiffImagePlugin import IFDRational
+    
+    if isinstance(value, IFDRational):
+        return (value.numerator, value.denominator)
+    if isinstance(value, tuple):
+        return tuple(rationals_to_tuples(item) for item in value)
+    if isinstance(value, dict):
+        return {tag: rationals_to_tuples(item) for tag, item in value.items()}
+    return value
+
+class ReadError:
+    
+    #stands in for the exif of a photo that couldn't be read at all, e.g. a truncated file that's still being copied
+    def __init__(self,reason):
+        self.reason = reason
 
 class PointExtractor:
     
-    def __init__(self,stringify=False):
+    def __init__(self,stringify=False,fast_exif=True):
         self.stringify = stringify
+        #read exif tags straight from the file header instead of opening the full image with PIL
+        self.fast_exif = fast_exif
 
     def standardize_exif_lat(self,exif_lat,dir):
         
@@ -101,34 +125,20 @@ class PointExtractor:
         if self.stringify:
             dilution_of_precision = str(dilution_of_precision)
         
-        print(dilution_of_precision)
         return dilution_of_precision
         
-    def standardize_exif_datetime(self,exif_datetime,utc_zone):
-        
-        if utc_zone == 0:
-            date, time = exif_datetime.split(' ')
-            date = date.replace(':','-')
-            return date + 'T' + time + '.000Z'
-        
-        date, time = exif_datetime.split(' ')
-        year, month, day = date.split(':')
-        time = time.split('.')[0]
-        hour, minute, sec = time.split(':')
-        
-        datetime = dt.datetime(int(year),int(month),int(day),int(hour),int(minute),int(sec))
-        datetime += dt.timedelta(hours=-utc_zone)
+    def standardize_epoch(self,epoch):
         
+        #one parsed timestamp as a naive UTC datetime, or as a gpx string with stringify
+        if epoch == NAT:
+            raise Exception('Invalid datetime')
         if self.stringify:
-            return ( str(datetime.year).zfill(2)   + '-'+
-                     str(datetime.month).zfill(2)  + '-'+
-                     str(datetime.day).zfill(2)    + 'T' +
-                     str(datetime.hour).zfill(2)   + ':'+
-                     str(datetime.minute).zfill(2) + ':'+
-                     str(datetime.second).zfill(2) +
-                     '.000Z' )
-        else:
-            return datetime
+            return Timestamps.format_iso([epoch])[0]
+        return np.int64(epoch).astype('datetime64[s]').item()
+    
+    #single value versions of the Timestamps batch parsers. the extractors parse whole columns at once instead
+    def standardize_exif_datetime(self,exif_datetime,utc_zone):
+        return self.standardize_epoch(Timestamps.parse_exif([exif_datetime],utc_zone)[0])
     
     def standardize_gcloud_lat(self,lat):
         
@@ -149,30 +159,9 @@ class PointExtractor:
         return ele
     
     def standardize_gcloud_datetime(self,gcloud_datetime,utc_zone):
-    
-        if utc_zone == 0:
-            date, time = gcloud_datetime.split(' ')
-            date = date.replace(':','-')
-            return date + 'T' + time + '.000Z'
         
-        date, time = gcloud_datetime.split(' ')
-        year, month, day = date.split('-')
-        time = time.split('.')[0]
-        hour, minute, sec = time.split(':')
-        
-        datetime = dt.datetime(int(year),int(month),int(day),int(hour),int(minute),int(sec))
-        datetime += dt.timedelta(hours=-utc_zone)
-        
-        if self.stringify:
-            return ( str(datetime.year).zfill(2)   + '-'+
-                     str(datetime.month).zfill(2)  + '-'+
-                     str(datetime.day).zfill(2)    + 'T' +
-                     str(datetime.hour).zfill(2)   + ':'+
-                     str(datetime.minute).zfill(2) + ':'+
-                     str(datetime.second).zfill(2) +
-                     '.000Z' )
-        else:
-            return datetime 
+        #drive reports imageMediaMetadata.time in the exif layout, e.g. '2019:02:14 06:28:54'
+        return self.standardize_epoch(Timestamps.parse_exif([gcloud_datetime],utc_zone)[0])
     
     def standardize_gpx_lat(self,lat):
 
@@ -195,17 +184,7 @@ class PointExtractor:
     def standardize_gpx_datetime(self,gpx_datetime):
         
         #expected format: '2019-02-14T06:28:54.000Z'
-     
-        if self.stringify:
-            return datetime
-        else:         
-            date, time = gpx_datetime.split('T')
-            year, month, day = date.split('-')
-            time = time.split('.')[0]
-            hour, minute, sec = time.split(':')
-             
-            datetime = dt.datetime(int(year),int(month),int(day),int(hour),int(minute),int(sec))
-            return datetime
+        return self.standardize_epoch(Timestamps.parse_iso([gpx_datetime])[0])
         
     def standardize_gpx_DOP(self,dilution_of_precision):
 
@@ -213,241 +192,388 @@ class PointExtractor:
             dilution_of_precision = float(dilution_of_precision)
         return dilution_of_precision
           
-    def get_points_local(self,dir,utc_zone):
+    def read_exif(self,photo):
+        
+        if self.fast_exif:
+            try:
+                return ExifReader.read_exif(photo)
+            except ExifReader.ExifFormatError:
+                #fall through to PIL for formats the header-only reader doesn't handle, e.g. png or gif
+                pass
+        
+        #imported here since PIL is slow to load and the fast reader handles jpegs
+        import PIL.Image
+        photo_image = PIL.Image.open(photo)
+        try:
+            exif_data = photo_image._getexif()
+        finally:
+            photo_image.close()
+        
+        if exif_data is None:
+            return None
+        
+        #only keep the tags that are standardized, so results stay small when sent back from worker processes
+        return {tag: rationals_to_tuples(exif_data[tag]) for tag in (DATETIME_TAG, GPS_GROUP_TAG) if tag in exif_data}
+    
+    def try_read_exif(self,photo):
+        
+        #one unreadable photo shouldn't abort the whole folder, so its error is returned in place of its exif
+        try:
+            return self.read_exif(photo)
+        except Exception as e:
+            return ReadError(f'{type(e).__name__}: {e}')
+    
+    def read_exif_list(self,photo_list,workers=1,pool=THREAD):
+        
+        with Metrics.timer('exif_read', len(photo_list)):
+            return self.read_exif_list_pooled(photo_list,workers,pool)
+    
+    def read_exif_list_pooled(self,photo_list,workers,pool):
+        
+        if workers <= 1 or len(photo_list) <= 1:
+            return [self.try_read_exif(photo) for photo in photo_list]
+        
+        if pool == PROCESS:
+            executor = ProcessPoolExecutor(max_workers=workers)
+        elif pool == THREAD:
+            executor = ThreadPoolExecutor(max_workers=workers)
+        else:
+            raise Exception('Invalid pool: ' + pool)
+        
+        #map preserves input order, so results line up with photo_list regardless of completion order
+        chunksize = max(1, len(photo_list) // (workers * 4))
+        with executor:
+            return list(executor.map(self.try_read_exif, photo_list, chunksize=chunksize))
+    
+    def read_exif_list_cached(self,photo_list,cache,workers=1,pool=THREAD):
+        
+        #only photos that are new or whose size/mtime changed since the last run are read from disk
+        stat_list = [os.stat(photo) for photo in photo_list]
+        exif_list = cache.lookup(photo_list,stat_list)
+        
+        miss_idx = [i for i, exif_data in enumerate(exif_list) if exif_data is PhotoCache.MISS]
+        miss_photo_list = [photo_list[i] for i in miss_idx]
+        miss_exif_list = self.read_exif_list(miss_photo_list,workers,pool)
+        #unreadable photos aren't cached, so they're read again next time
+        store_idx = [j for j, exif_data in enumerate(miss_exif_list) if not isinstance(exif_data, ReadError)]
+        cache.store([miss_photo_list[j] for j in store_idx],[stat_list[miss_idx[j]] for j in store_idx],
+                    [miss_exif_list[j] for j in store_idx])
+        
+        for i, exif_data in zip(miss_idx, miss_exif_list):
+            exif_list[i] = exif_data
+        
+        Metrics.count('photo_cache_hits', len(photo_list) - len(miss_idx))
+        Metrics.count('photo_cache_misses', len(miss_idx))
+        return exif_list
+    
+    def standardize_exif_point(self,exif_data):
+        
+        #returns (point, None) on success or (None, reason) if the photo has to be skipped.
+        #the point keeps the raw exif datetime, build_photo_track parses them all at once
+        if exif_data is None:
+            return None, 'no exif data'
+        
+        gps_data = exif_data.get(GPS_GROUP_TAG)
+        if gps_data is None:
+            return None, 'no GPS data'
+        
+        try:       
+            lat = self.standardize_exif_lat(gps_data[LATITUDE_TAG], gps_data[NORTH_SOUTH_TAG])
+        except:
+            return None, 'missing or invalid latitude data'
+        
+        try:
+            lon = self.standardize_exif_lon(gps_data[LONGITUDE_TAG], gps_data[EAST_WEST_TAG])
+        except:
+            return None, 'missing or invalid longitude data'
+        
+        datetime = exif_data.get(DATETIME_TAG)
+        if not isinstance(datetime, str):
+            return None, 'missing or invalid datetime data'
+        
+        try:   
+            ele = self.standardize_exif_ele(gps_data.get(ALTITUDE_TAG),gps_data.get(ALTITUDE_SIGN_TAG))
+        except:
+            return None, 'invalid ele data'
+        
+        try:   
+            dilution_of_precision = self.standardize_exif_dilution_of_precision(gps_data.get(GPS_PRECISION_TAG))
+        except:
+            return None, 'invalid dilution_of_precision data'
+        
+        return (datetime,lat,lon,ele,dilution_of_precision), None
+          
+    def list_photos(self,dir):
+        
+        #photo paths in dir, sorted so output order doesn't depend on the file system
+        return sorted(dir + "/" + fname for fname in os.listdir(dir) if fname.split('.')[-1] in EXT_LIST)
+    
+    def get_points_local(self,dir,utc_zone,workers=1,pool=THREAD,cache=None):
         
         print(f'Extracting points from local <{dir}>')
         
+        photo_list = self.list_photos(dir)
+        if len(photo_list) == 0:
+            raise Exception("No photos in directory:", dir)
+        Metrics.count('photos_listed', len(photo_list))
+        
+        track, skipped_photo_ctr = self.get_points_photos(photo_list,utc_zone,workers,pool,cache)
+            
+        tot_photos = len(photo_list)
+        print ("\n***** ANALYSIS COMPLETED *****\n")
+        print (f'total photos analyzed in <{dir}> : {tot_photos}')
+        print (f'analyzed photos missing GPS data: {skipped_photo_ctr} ({round(skipped_photo_ctr / tot_photos * 100,2)}%)')
+            
+        return track
+    
+    def get_points_photos(self,photo_list,utc_zone,workers=1,pool=THREAD,cache=None,failed_list=None):
+        
+        #returns (sorted track of the given photo files, number of photos skipped).
+        #unreadable photos are skipped too, and also added to failed_list if one is given
+        
         #track stats
         used_photo_ctr = 0
         skipped_photo_ctr = 0
         
         #list of points to return
         point_list = []
+        point_photo_list = []
         
-        #list of photo names
-        photo_list = [dir + "/" + fname for fname in os.listdir(dir) if fname.split('.')[-1] in EXT_LIST]
-        if len(photo_list) == 0:
-            raise Exception("No photos in directory:", dir)
-        
-        for photo in photo_list:
-            photo_image = PIL.Image.open(photo)
-            exif_data = photo_image._getexif()
+        #file reads are the slow part, so only they are farmed out to workers
+        if cache is None:
+            exif_list = self.read_exif_list(photo_list,workers,pool)
+        else:
+            exif_list = self.read_exif_list_cached(photo_list,cache,workers,pool)
         
-            if exif_data is None:
-                print("WARNING: skipping photo with no exif data:", photo)
-                skipped_photo_ctr += 1
-                photo_image.close()
-                continue
-            
-            if exif_data.get(GPS_GROUP_TAG) is None:
-                print("WARNING: skipping photo with no GPS data:", photo)
+        for photo, exif_data in zip(photo_list, exif_list):
+            if isinstance(exif_data, ReadError):
+                Metrics.warn(f'cannot read photo ({exif_data.reason}): {photo}')
+                self.skip_photo(photo,'unreadable file')
                 skipped_photo_ctr += 1
-                photo_image.close()
+                if failed_list is not None:
+                    failed_list.append(photo)
                 continue
-                        
-            try:       
-                lat = self.standardize_exif_lat(exif_data[GPS_GROUP_TAG][LATITUDE_TAG], exif_data[GPS_GROUP_TAG][NORTH_SOUTH_TAG])
-            except:
-                print("WARNING: skipping photo with missing or invalid latitude data:", photo)
-                skipped_photo_ctr += 1
-                photo_image.close()
-                continue
-            
-            try:
-                lon = self.standardize_exif_lon(exif_data[GPS_GROUP_TAG][LONGITUDE_TAG], exif_data[GPS_GROUP_TAG][EAST_WEST_TAG])
-            except:
-                print("WARNING: skipping photo with missing or invalid longitude data:", photo) 
-                skipped_photo_ctr += 1
-                photo_image.close()
-                continue     
             
-            try:
-                datetime = self.standardize_exif_datetime(exif_data[DATETIME_TAG],utc_zone)
-            except:
-                print("WARNING: skipping photo with missing or invalid datetime data:", photo) 
-                skipped_photo_ctr += 1
-                photo_image.close()
-                continue    
+            point, skip_reason = self.standardize_exif_point(exif_data)
             
-            try:   
-                ele = self.standardize_exif_ele(exif_data[GPS_GROUP_TAG].get(ALTITUDE_TAG),exif_data[GPS_GROUP_TAG].get(ALTITUDE_SIGN_TAG))
-            except:
-                print("WARNING: skipping photo with invalid ele data:", photo) 
+            if point is None:
+                self.skip_photo(photo,skip_reason)
                 skipped_photo_ctr += 1
-                photo_image.close()
                 continue
-            
-            try:   
-                dilution_of_precision = self.standardize_exif_dilution_of_precision(exif_data[GPS_GROUP_TAG].get(GPS_PRECISION_TAG))
-            except:
-                print("WARNING: skipping photo with invalid dilution_of_precision data:", photo) 
-                skipped_photo_ctr += 1
-                photo_image.close()
-                continue  
     
-            point_list.append((datetime,lat,lon,ele,dilution_of_precision))
+            point_list.append(point)
+            point_photo_list.append(photo)
             used_photo_ctr += 1
-            photo_image.close()
-            
-        tot_photos = used_photo_ctr + skipped_photo_ctr 
-        print ("\n***** ANALYSIS COMPLETED *****\n")
-        print (f'total photos analyzed in <{dir}> : {tot_photos}')
-        print (f'analyzed photos missing GPS data: {skipped_photo_ctr} ({round(skipped_photo_ctr / tot_photos * 100,2)}%)')
-            
-        return point_list
+        
+        track, invalid_ctr = self.build_photo_track(point_list,point_photo_list,
+                                                    Timestamps.parse_exif([point[0] for point in point_list],utc_zone))
+        used_photo_ctr -= invalid_ctr
+        skipped_photo_ctr += invalid_ctr
+        
+        Metrics.count('photos_used', used_photo_ctr)
+        return track, skipped_photo_ctr
+    
+    def skip_photo(self,photo_name,skip_reason):
+        Metrics.warn(f'skipping photo with {skip_reason}: {photo_name}')
+        Metrics.count('photos_skipped.' + skip_reason)
+    
+    def build_photo_track(self,point_list,photo_name_list,time):
+        
+        #time is the batch parse of the points' raw datetimes. photos whose datetime didn't parse are skipped
+        #like any other invalid photo. returns (sorted track, number of photos skipped)
+        invalid_idx = np.flatnonzero(time == NAT)
+        for i in invalid_idx:
+            self.skip_photo(photo_name_list[i],'missing or invalid datetime data')
+        
+        track = Track.from_points(point_list,time)
+        return track.take(np.flatnonzero(track.time != NAT)).sort(), len(invalid_idx)
+    
+    def standardize_gcloud_point(self,photo):
+        
+        #returns (point, None) on success or (None, reason) if the photo has to be skipped.
+        #the point keeps the raw datetime, build_photo_track parses them all at once
+        try:
+            datetime = photo['imageMediaMetadata']['time']
+        except:
+            return None, 'missing or invalid datetime data'
+        if not isinstance(datetime, str):
+            return None, 'missing or invalid datetime data'
+        
+        try:
+            loc_data = photo['imageMediaMetadata']['location']
+        except:
+            return None, 'no GPS data'
+        
+        try:       
+            lat = self.standardize_gcloud_lat(loc_data['latitude'])
+        except:
+            return None, 'missing or invalid latitude data'
+        
+        try:
+            lon = self.standardize_gcloud_lon(loc_data['longitude'])
+        except:
+            return None, 'missing or invalid longitude data'
+        
+        try:   
+            ele = self.standardize_gcloud_ele(loc_data['altitude'])
+        except:
+            return None, 'invalid altitude data'
+        
+        return (datetime,lat,lon,ele,None), None
     
-    def get_points_gcloud(self,dir,utc_zone):
+    def get_points_gcloud(self,dir,utc_zone,service=None,sync=None,folder_id=None):
         
         print(f'Extracting points from gcloud <{dir}>')
         
         #track stats
         used_photo_ctr = 0
         skipped_photo_ctr = 0
-    
-        # gcloud api docs: https://developers.google.com/drive/api/v3/reference/files#resource
-        # seed code: https://developers.google.com/drive/api/v3/quickstart/python?authuser=1
-        
-        # If modifying these scopes, delete the file token.pickle.
-        SCOPES = ['https://www.googleapis.com/auth/drive.metadata.readonly']
-    
-        creds = None
-        # The file token.pickle stores the user's access and refresh tokens, and is
-        # created automatically when the authorization flow completes for the first
-        # time.
-        if os.path.exists('token.pickle'):
-            with open('token.pickle', 'rb') as token:
-                creds = pickle.load(token)
-        # If there are no (valid) credentials available, let the user log in.
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    'credentials.json', SCOPES)
-                creds = flow.run_local_server(port=0)
-            # Save the credentials for the next run
-            with open('token.pickle', 'wb') as token:
-                pickle.dump(creds, token)
-    
-        service = build('drive', 'v3', credentials=creds)
+        listed_file_ctr = 0
+        
+        #a service can be passed in to reuse a client, or to run against the offline FakeDrive
+        if service is None:
+            service = DriveClient.get_drive_service()
         
         # Call the Drive v3 API
-        files = service.files()
-        
-        folder_request = files.list(q="name='" + dir + "'")
-        folder_result = folder_request.execute()
-        folder_items = folder_result.get('files', [])
-        if len(folder_items) == 0:
-            raise Exception("Folder not found: " + dir)
-        if len(folder_items) > 1:
-            raise Exception("Multiple folders with the same name found (a unique name is needed): " + dir)
-        folder_id = folder_items[0]['id']
-        
-        request = files.list(q="mimeType != 'application/vnd.google-apps.folder'" \
-                               " and '" + folder_id + "' in parents",
-                             pageSize=100,
-                             fields="nextPageToken, files(id, name,imageMediaMetadata,createdTime)")
-        result = request.execute()
-        photos = result.get('files', [])
-        if len(photos) == 0:
-            raise Exception('No files found in directory: ' + dir)
+        #folder_id skips the name lookup, e.g. when a DriveSession already resolved it
+        if sync is None:
+            files = service.files()
+            if folder_id is None:
+                folder_id = DriveClient.find_folder_id(files,dir)
+            photo_pages = DriveClient.iter_photo_pages(files,folder_id)
+        else:
+            #a DriveSync mirror only fetches what changed since its last run
+            photo_pages = [sync.update(service,folder_id)]
     
-        point_list.sort()    
         point_list = []
+        point_photo_list = []
         
-        while(True):
+        for photos in photo_pages:
+            listed_file_ctr += len(photos)
+            Metrics.count('drive_files_listed', len(photos))
     
             for photo in photos:
                 if photo['name'].split('.')[-1] not in EXT_LIST:
                     continue
-                            
-                try:
-                    datetime = self.standardize_gcloud_datetime(photo['imageMediaMetadata']['time'],utc_zone)
-                except:
-                    print("WARNING: skipping photo with missing or invalid datetime data:", photo['name']) 
-                    skipped_photo_ctr += 1
-                    continue    
-                
-                try:
-                    loc_data = photo['imageMediaMetadata']['location']
-                except:
-                    print("WARNING: skipping photo with no GPS data:", photo['name'])
-                    skipped_photo_ctr += 1
-                    continue
                 
-                try:       
-                    lat = self.standardize_gcloud_lat(loc_data['latitude'])
-                except:
-                    print("WARNING: skipping photo with missing or invalid latitude data:", photo['name'])
-                    skipped_photo_ctr += 1
-                    continue
+                point, skip_reason = self.standardize_gcloud_point(photo)
                 
-                try:
-                    lon = self.standardize_gcloud_lon(loc_data['longitude'])
-                except:
-                    print("WARNING: skipping photo with missing or invalid longitude data:", photo['name']) 
-                    skipped_photo_ctr += 1
-                    continue   
-                
-                try:   
-                    ele = self.standardize_gcloud_ele(loc_data['altitude'])
-                except:
-                    print("WARNING: skipping photo with invalid altitude data:", photo['name']) 
+                if point is None:
+                    self.skip_photo(photo['name'],skip_reason)
                     skipped_photo_ctr += 1
                     continue
     
-                point_list.append((datetime,lat,lon,ele))
+                point_list.append(point)
+                point_photo_list.append(photo['name'])
                 used_photo_ctr += 1
-            
-            request = files.list_next(request,result)
-            if request is None:
-                break
-            result = request.execute()
-            photos = result.get('files', [])
+        
+        if listed_file_ctr == 0:
+            raise Exception('No files found in directory: ' + dir)
+        
+        track, invalid_ctr = self.build_photo_track(point_list,point_photo_list,
+                                                    Timestamps.parse_exif([point[0] for point in point_list],utc_zone))
+        used_photo_ctr -= invalid_ctr
+        skipped_photo_ctr += invalid_ctr
         
         tot_photos = used_photo_ctr + skipped_photo_ctr 
+        Metrics.count('photos_used', used_photo_ctr)
         print ("\n***** ANALYSIS COMPLETED *****\n")
         print ("total photos processed:", tot_photos)
         print ("photos missing GPS data:", skipped_photo_ctr , "(" +str(round(skipped_photo_ctr / tot_photos * 100,2)) + "%)")
     
-        point_list.sort()    
-        return point_list
+        return track
     
-    def get_points_gpx(self,gpx_file):
+    def get_points_gpx(self,gpx_file,cache=True):
         
         if not os.path.exists(gpx_file):
             raise Exception(f'file not found: {gpx_file}')
         
-        print(f'Extracting points from gpx file <{gpx_file}>')
-    
-        tree = ET.parse(gpx_file)
-        root = tree.getroot()
+        #the parsed columns are cached next to the file and memory mapped on later runs
+        if cache:
+            start = time.perf_counter()
+            track = TrackCache.load(gpx_file)
+            if track is not None:
+                Metrics.add_time('gpx_cache_load', time.perf_counter() - start, len(track))
+                print(f'Loading cached points of gpx file <{gpx_file}>')
+                return track
+            cache_key = TrackCache.get_key(gpx_file)
         
-        #get namespace which is needed to check name of later child nodes
-        ns = re.match(r'{.*}', root.tag).group(0)
+        print(f'Extracting points from gpx file <{gpx_file}>')
+        start = time.perf_counter()
     
-        point_df = pd.DataFrame(columns=[LAT,LON,ELE,DOP])
-        point_df.index.name = DATETIME
-      
-        for track in root:
-            #skip non-track top-level children, e.g. metadata
-            if track.tag != ns + 'trk':
-                continue
-            for segment in track:
-                for point in segment:
-                    lat = self.standardize_gpx_lat(point.attrib['lat'])
-                    lon = self.standardize_gpx_lon(point.attrib['lon'])
-                    ele = None
-                    datetime = None
-                    dilution_of_precision = None
-                    for opt_data in point:
-                        if opt_data.tag == ns + 'ele':
-                            ele = self.standardize_gpx_ele(opt_data.text)
-                        elif opt_data.tag == ns + 'time':
-                            datetime = self.standardize_gpx_datetime(opt_data.text)
-                        elif opt_data.tag == ns + 'DOP':
-                            dilution_of_precision = self.standardize_gpx_DOP(opt_data.text)
-                    point_df.loc[pd.to_datetime(datetime)] = {LAT:lat, LON:lon, ELE:ele, DOP:dilution_of_precision}
-    
-        point_df.sort_index(inplace=True)
-        return point_df
\ No newline at end of file
+        #columns are accumulated in typed arrays and the frame is built once at the end.
+        #missing ele/DOP are stored as nan. every trkseg gets its own segment number
+        lat_arr = array.array('d')
+        lon_arr = array.array('d')
+        ele_arr = array.array('d')
+        DOP_arr = array.array('d')
+        segment_arr = array.array('i')
+        datetime_list = []
+        
+        ns = None
+        in_track = False
+        segment = 0
+        
+        #stream the file so memory stays flat. each trkpt is dropped from its parent as soon as it's read
+        parent_stack = []
+        opener = gzip.open if gpx_file.endswith('.gz') else open
+        with opener(gpx_file, 'rb') as gpx_source:
+            for event, elem in ET.iterparse(gpx_source, events=('start','end')):
+            
+                if event == 'start':
+                    if ns is None:
+                        #get namespace which is needed to check name of later child nodes
+                        ns = re.match(r'{.*}', elem.tag).group(0)
+                    #only points under a top-level trk are used, e.g. skip metadata and waypoints
+                    if elem.tag == ns + 'trk' and len(parent_stack) == 1:
+                        in_track = True
+                    elif elem.tag == ns + 'trkseg' and in_track and len(segment_arr) and segment_arr[-1] == segment:
+                        segment += 1
+                    parent_stack.append(elem)
+                    continue
+            
+                parent_stack.pop()
+                if elem.tag == ns + 'trk':
+                    in_track = False
+                if elem.tag != ns + 'trkpt' or not in_track:
+                    continue
+            
+                lat_arr.append(self.standardize_gpx_lat(elem.attrib['lat']))
+                lon_arr.append(self.standardize_gpx_lon(elem.attrib['lon']))
+                ele = math.nan
+                datetime = None
+                dilution_of_precision = math.nan
+                for opt_data in elem:
+                    if opt_data.tag == ns + 'ele':
+                        ele = self.standardize_gpx_ele(opt_data.text)
+                    elif opt_data.tag == ns + 'time':
+                        datetime = opt_data.text
+                    elif opt_data.tag == ns + 'DOP':
+                        dilution_of_precision = self.standardize_gpx_DOP(opt_data.text)
+                ele_arr.append(ele)
+                datetime_list.append(datetime)
+                DOP_arr.append(dilution_of_precision)
+                segment_arr.append(segment)
+            
+                parent_stack[-1].remove(elem)
+        
+        #one vectorized parse for all timestamps, converted to UTC. sub-second precision is dropped
+        track = Track(Timestamps.parse_iso(datetime_list),
+                      np.frombuffer(lat_arr),
+                      np.frombuffer(lon_arr),
+                      np.frombuffer(ele_arr),
+                      np.frombuffer(DOP_arr),
+                      segment=np.frombuffer(segment_arr, dtype=np.int32))
+        
+        #points without a valid timestamp can't be placed on the track, they are dropped like invalid photos
+        untimed_ctr = int(np.count_nonzero(track.time == NAT))
+        if untimed_ctr:
+            Metrics.warn(f'skipping {untimed_ctr} points with missing or invalid time in gpx file: {gpx_file}')
+            Metrics.count('gpx_points_skipped.missing or invalid time', untimed_ctr)
+            track = track.take(np.flatnonzero(track.time != NAT))
+        track = track.sort()
+        Metrics.add_time('gpx_parse', time.perf_counter() - start, len(track))
+        
+        if cache:
+            TrackCache.store(gpx_file, track, cache_key)
+        return track
\ No newline at end of file
@@ -0,0 +1,86 @@
+#installed packages
+import numpy as np
+
+#name of the constant term in RegressionFit.params
+INTERCEPT = 'intercept'
+
+class RegressionFit:
+
+    def __init__(self, params, rsquared, rsquared_adj, vif):
+
+        #params maps each feature, then INTERCEPT, to its coefficient. vif maps each feature to its
+        #variance inflation factor and is empty for single feature fits
+        self.params = params
+        self.rsquared = rsquared
+        self.rsquared_adj = rsquared_adj
+        self.vif = vif
+
+class Regression:
+
+    #ols of one target on any subset of a fixed set of candidate features, always with an intercept.
+    #the centered gram matrix of the features and the target is built once per set of rows, so each fit only
+    #solves a small (features x features) system, however many rows there are.
+    #like statsmodels' missing='drop', a fit drops the rows missing the target or one of its own features. fits
+    #on features without missing values share one gram matrix, the others get one per set of incomplete features
+
+    def __init__(self, X_df, y):
+
+        self.features = list(X_df.columns)
+        self.feature_idx = {feature: i for i, feature in enumerate(self.features)}
+
+        X = X_df.values.astype(np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        valid = ~np.isnan(y)
+        self.X = X[valid]
+        self.y = y[valid]
+        if len(self.y) == 0:
+            raise Exception('No rows with a target to fit a regression on')
+        self.X_missing = np.isnan(self.X)
+        self.incomplete_idx = set(np.flatnonzero(self.X_missing.any(axis=0)).tolist())
+
+        #tuple of incomplete feature indices -> (nobs, x_mean, y_mean, xx, xy, yy) of the rows complete in them.
+        #columns of other incomplete features come out nan there, but are never indexed
+        self.stats = {}
+
+    def get_stats(self, incomplete_idx):
+
+        if incomplete_idx not in self.stats:
+            valid = ~self.X_missing[:, list(incomplete_idx)].any(axis=1)
+            X = self.X[valid]
+            y = self.y[valid]
+            if len(y) == 0:
+                raise Exception('No complete rows to fit a regression on, missing values in: ' +
+                                ', '.join(self.features[i] for i in incomplete_idx))
+
+            #centering keeps the gram matrix well conditioned when features have large offsets, e.g. elevation
+            x_mean = X.mean(axis=0)
+            y_mean = y.mean()
+            X_centered = X - x_mean
+            y_centered = y - y_mean
+            self.stats[incomplete_idx] = (len(y), x_mean, y_mean, X_centered.T @ X_centered, X_centered.T @ y_centered,
+                                          y_centered @ y_centered)
+        return self.stats[incomplete_idx]
+
+    def fit(self, feature_list):
+
+        idx = [self.feature_idx[feature] for feature in feature_list]
+        nobs, x_mean, y_mean, xx_all, xy_all, yy = self.get_stats(tuple(sorted(set(idx) & self.incomplete_idx)))
+        xx = xx_all[np.ix_(idx, idx)]
+        #pseudo inverse, like statsmodels, so a degenerate feature set still fits
+        xx_inv = np.linalg.pinv(xx)
+
+        coefs = xx_inv @ xy_all[idx]
+        intercept = y_mean - x_mean[idx] @ coefs
+
+        rss = yy - xy_all[idx] @ coefs
+        rsquared = 1 - rss / yy
+        rsquared_adj = 1 - (nobs - 1) / (nobs - len(idx) - 1) * (1 - rsquared)
+
+        #vif of a feature is 1 / (1 - R2) of regressing it on the others, i.e. the diagonal of the inverse correlation matrix
+        vif = {}
+        if len(idx) > 1:
+            vif = dict(zip(feature_list, np.diag(xx_inv) * np.diag(xx)))
+
+        params = dict(zip(feature_list, coefs))
+        params[INTERCEPT] = intercept
+        return RegressionFit(params, rsquared, rsquared_adj, vif)
@@ -1,292 +1,357 @@
 #std packages
 import argparse
-import datetime as dt
-import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.ticker import PercentFormatter
-import pylab
-import statsmodels.api as sm
-
-from statsmodels.stats.outliers_influence import variance_inflation_factor
 
 
 #local packages
+import Geo
 import PointExtractor
-import GPXWriter
+import Interpolator
+import Metrics
+import Regression
+import SpatialIndex
 
-#positions in point tuple
-DATETIME = 0
-LAT = 1
-LON = 2
-ELE = 3
+#max number of (offset, point) pairs evaluated at once by get_offset_err, bounds its peak memory
+OFFSET_BATCH_SIZE = 2**22
 
-# https://www.thoughtco.com/degree-of-latitude-and-longitude-distance-4070616
-DEG_LAT_DIST = 111 * 10**3
+#the coarse calibration pass evaluates at most this many offsets, each finer level shrinks the step by REFINE_FACTOR
+COARSE_OFFSET_CNT = 2000
+REFINE_FACTOR = 10
 
-def get_lon_width(lat):
-    return haversine_dist(lat,lat,0,1)
+#manifest of the bundled hike pairs, used when no manifest is given
+DEFAULT_MANIFEST = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'assets', 'gpx_misc', 'manifest.csv')
 
-def haversine_dist(lat1,lat2,lon1,lon2):
-    
-    #avg earth radius used for haversine dist formula
-    R = 6371000
+def get_offset_err(src_time,src_lat,src_lon,ref_interp,offsets,deg_lon_dist):
     
-    delta_lat = math.radians(lat2 - lat1)
-    delta_lon = math.radians(lon2 - lon1)
-    lat1 = math.radians(lat1)
-    lat2 = math.radians(lat2)
+    #mean l1 and l2 err of the src points against the interpolated ref track, for every offset at once.
+    #offsets are in seconds and may be fractional, a positive offset compares each src point with the ref position
+    #that many seconds later. pairs that land outside the ref track are left out of the mean,
+    #like rows without a ref point in get_err_df
+    mean_l1_err = np.empty(len(offsets))
+    mean_l2_err = np.empty(len(offsets))
     
-    a = math.sin(delta_lat/2)**2 + math.cos(lat1)*math.cos(lat2)*math.sin(delta_lon/2)**2
-    c = 2*math.asin(math.sqrt(a))
+    batch_size = max(1, OFFSET_BATCH_SIZE // max(1, len(src_time)))
+    for start in range(0, len(offsets), batch_size):
+        batch = offsets[start:start + batch_size]
+        
+        ref_lat, ref_lon = ref_interp.lat_lon(src_time[np.newaxis,:] + batch[:,np.newaxis])
+        
+        # full haversine dist not used for perf reasons. for calibration approx is fine
+        l2_err = Geo.flat_sq_dist(ref_lat, src_lat[np.newaxis,:],
+                                  ref_lon, src_lon[np.newaxis,:],
+                                  deg_lon_dist)
+        
+        with np.errstate(invalid='ignore'):
+            n_valid = (~np.isnan(l2_err)).sum(axis=1)
+            mean_l2_err[start:start + len(batch)] = np.nansum(l2_err, axis=1) / n_valid
+            mean_l1_err[start:start + len(batch)] = np.nansum(np.sqrt(l2_err), axis=1) / n_valid
     
-    return R * c
-
-def calibrate_src(orig_src_df,orig_ref_df):
+    return mean_l1_err, mean_l2_err
 
-    src_df = orig_src_df.copy()
-    orig_src_start = src_df.index.min()
+def calibrate_src(src_track,ref_track,max_window=None,coarse_step=None,resolution=1,name=None):
     
-    #create entries for missing seconds
-    ref_df = orig_ref_df.resample('1S').first()
-    #interpolate lat,lon,ele for newly created points
-    ref_df.interpolate(method='time',inplace=True)
-
-    min_offset = min(0,int((ref_df.index.min() - src_df.index.min()).total_seconds()))
-    max_offset = max(0,int((ref_df.index.max() - src_df.index.max()).total_seconds()))
+    #max_window caps the search to +/- that many seconds, e.g. 7200 after a timezone mistake.
+    #the search starts with coarse_step (by default sized so the whole range takes COARSE_OFFSET_CNT offsets)
+    #and refines around the best offset until the step reaches resolution, which may be below 1 second.
+    #name identifies the track pair in errors
+    
+    start = time.perf_counter()
+    ref_interp = Interpolator.Interpolator(ref_track)
+    
+    #tracks are sorted, so the first and last points bound them
+    src_start, src_end = src_track.time[0], src_track.time[-1]
+    ref_start, ref_end = ref_track.time[0], ref_track.time[-1]
     
-    merged_df = src_df.join(ref_df,how='outer',lsuffix='_src',rsuffix='_ref')
-    src_cols = ['lat_src','lon_src']
+    min_offset = min(0,int(ref_start - src_start))
+    max_offset = max(0,int(ref_end - src_end))
+    if max_window is not None:
+        min_offset = max(min_offset, -max_window)
+        max_offset = min(max_offset, max_window)
     
     print(f'Testing calibration range: [{min_offset}, {max_offset}]')
-
-    orig_err_df = get_err_df(merged_df)
-    orig_l1_err = orig_err_df['l1_err'].mean()
-        
-    merged_df[src_cols] = merged_df[src_cols].shift(min_offset)
     
-    MAX_ITR = merged_df.index[-1] - pd.Timedelta(src_df.index[-1] - src_df.index[0])
-    mean_err_df = pd.DataFrame(columns=['l1_err','l2_err'])
-    mean_err_df.index.name = 'datetime'
+    #only calc once. change insignificant over course of single hike
+    deg_lon_dist = Geo.get_lon_width(src_track.lat[0])
     
-
-    for time_itr in merged_df.index[range(0, max_offset - min_offset)]:
+    offset_err_args = (src_track.time, src_track.lat, src_track.lon, ref_interp)
+    
+    if coarse_step is None:
+        coarse_step = max(1, (max_offset - min_offset) // COARSE_OFFSET_CNT)
+    
+    #every offset of a level is evaluated in one batched pass
+    step = coarse_step
+    offsets = np.arange(min_offset, max(max_offset, min_offset + 1), step, dtype=np.float64)
+    while True:
+        Metrics.count('calibration_passes')
+        Metrics.count('calibration_offsets', len(offsets))
+        mean_l1_err, mean_l2_err = get_offset_err(*offset_err_args, offsets, deg_lon_dist)
+        #an offset whose shifted src track doesn't overlap the ref track at all has no error
+        if np.all(np.isnan(mean_l1_err)):
+            raise Exception(f'No offset in the calibration range [{min_offset}, {max_offset}] makes the src track '
+                            f'overlap the ref track, widen max_window or check the pair: {name}')
+        best_idx = np.nanargmin(mean_l1_err)
+        best_l1_err = mean_l1_err[best_idx]
+        best_offset = offsets[best_idx]
         
-        # full haversine dist not used for perf reasons. for calibration approx is fine
-        err_df = get_err_df(merged_df)
-        mean_err_df.loc[time_itr] = {'l1_err':err_df['l1_err'].mean(),'l2_err':err_df['l2_err'].mean()}
-        merged_df[src_cols] = merged_df[src_cols].shift(1)
-   
-#     mean_err_df.dropna(inplace=True)
-    best_l1_err = mean_err_df['l1_err'].min()
-    best_idx = mean_err_df['l1_err'].values.argmin()
-    best_datetime = mean_err_df.index[best_idx]   
-    best_offset = int((best_datetime - orig_src_start).total_seconds())
-    
-    merged_df[src_cols] = merged_df[src_cols].shift(int(pd.Timedelta(best_datetime - MAX_ITR).total_seconds()))
-    best_err_df = get_err_df(merged_df)
+        if step <= resolution:
+            break
+        
+        #search the neighbourhood of the best offset at the next finer step
+        window = step
+        step = max(step / REFINE_FACTOR, resolution)
+        n_steps = int(np.ceil(window / step))
+        offsets = best_offset + step * np.arange(-n_steps, n_steps + 1)
+        offsets = offsets[(offsets >= min_offset) & (offsets <= max_offset)]
+    
+    orig_l1_err = get_offset_err(*offset_err_args, np.array([0.0]), deg_lon_dist)[0][0]
+    
+    #whole second offsets stay ints
+    best_offset = int(best_offset) if resolution >= 1 else round(float(best_offset), 6)
+    Metrics.add_time('calibrate', time.perf_counter() - start, len(src_track))
     
+    if np.isnan(orig_l1_err):
+        reduction = 'uncalibrated src track does not overlap the ref track'
+    else:
+        reduction = f'({round((best_l1_err - orig_l1_err) / orig_l1_err * 100,2)}%) reduction ' \
+                    f'from {round(orig_l1_err,2)}'
     print(
             f'Calibrated L1 err:   {round(best_l1_err,2)} ' \
-            f'({round((best_l1_err - orig_l1_err) / orig_l1_err * 100,2)}%) reduction ' \
-            f'from {round(orig_l1_err,2)} ' \
+            f'{reduction} ' \
             f'@ offset {best_offset}'
         )
         
     return best_offset
 
         
+def iter_overlaps(src_track,ref_track,offset=0):
+    
+    #(src segment, ref segment, ref seconds) for every pair of segments that overlap once the src is offset
+    ref_segment_list = ref_track.split_segments()
+    for src_segment in src_track.split_segments():
+        for ref_segment in ref_segment_list:
+            ref_time = np.arange(max(ref_segment.time[0], int(np.ceil(src_segment.time[0] + offset))),
+                                 min(ref_segment.time[-1], int(np.floor(src_segment.time[-1] + offset))) + 1)
+            if len(ref_time):
+                yield src_segment, ref_segment, ref_time
+
+def get_merged_df(src_track,ref_track,offset=0):
+    
+    #one row per second of the ref track that the offset src track overlaps, both tracks interpolated there.
+    #s_nearest_* and d_nearest_src are the time and distance to the nearest original point.
+    #d_nearest_ref is the distance from the src position to the closest ref point whatever its time,
+    #an err that doesn't depend on the src clock.
+    #overlapping segments are merged one pair at a time and concatenated, so gaps between segments get no rows
+    ref_index = SpatialIndex.SpatialIndex.from_track(ref_track)
+    
+    frame_list = [get_segment_merged_df(src_segment,ref_segment,ref_time,offset,ref_index)
+                  for src_segment, ref_segment, ref_time in iter_overlaps(src_track,ref_track,offset)]
+    if len(frame_list) == 0:
+        return get_segment_merged_df(src_track,ref_track,np.arange(0),offset,ref_index)
+    return pd.concat(frame_list)
+
+def get_segment_merged_df(src_track,ref_track,ref_time,offset,ref_index):
+    
+    src_interp = Interpolator.Interpolator(src_track)
+    ref_interp = Interpolator.Interpolator(ref_track)
+    src_time = ref_time - offset
+    
+    merged_df = pd.DataFrame(index=pd.DatetimeIndex(ref_time.astype('datetime64[s]'), name='datetime'))
+    
+    merged_df['lat_src'], merged_df['lon_src'] = src_interp.lat_lon(src_time)
+    merged_df['ele_src'] = src_interp.col('ele', src_time)
+    merged_df['DOP_src'] = src_interp.col('DOP', src_time)
+    nearest_idx = src_interp.nearest(src_time)
+    merged_df['s_nearest_src'] = np.abs(src_track.time[nearest_idx] - src_time).astype(np.float64)
+    merged_df['d_nearest_src'] = Geo.haversine_dist(src_track.lat[nearest_idx],
+                                                    merged_df['lat_src'].values,
+                                                    src_track.lon[nearest_idx],
+                                                    merged_df['lon_src'].values)
+    
+    merged_df['lat_ref'], merged_df['lon_ref'] = ref_interp.lat_lon(ref_time)
+    merged_df['ele_ref'] = ref_interp.col('ele', ref_time)
+    nearest_idx = ref_interp.nearest(ref_time)
+    merged_df['s_nearest_ref'] = np.abs(ref_track.time[nearest_idx] - ref_time).astype(np.float64)
+    merged_df['d_nearest_ref'] = ref_index.nearest(merged_df['lat_src'].values, merged_df['lon_src'].values)[1]
+    
+    merged_df.dropna(inplace=True)
+    return merged_df
+
 def get_err_df(merged_df):
     
     #only calc once. change insignificant over course of single hike
-    DEG_LON_DIST = get_lon_width(merged_df.loc[merged_df['lat_src'].first_valid_index(),
+    DEG_LON_DIST = Geo.get_lon_width(merged_df.loc[merged_df['lat_src'].first_valid_index(),
                                                'lat_src'])
     
     #taking sqrt for err than squaring for sq_err is extra work, but doing for clarity of metrics
     err_df = pd.DataFrame(index=merged_df.index)
     
-    err_df['l2_err'] = (
-        np.square((merged_df['lat_src'] - merged_df['lat_ref']) * DEG_LAT_DIST) +
-        np.square((merged_df['lon_src'] - merged_df['lon_ref']) * DEG_LON_DIST)
-    )
+    err_df['l2_err'] = Geo.flat_sq_dist(merged_df['lat_ref'], merged_df['lat_src'],
+                                         merged_df['lon_ref'], merged_df['lon_src'],
+                                         DEG_LON_DIST)
     
     err_df['l1_err'] = np.sqrt(err_df['l2_err'])
               
     return err_df
 
-def stat_summary(X,Y):
-    if X.ndim == 1:
-        X_mod = X.to_frame()
-    else:
-        X_mod = X.copy()
-    X_mod.insert(len(X_mod.columns),'intercept',1)
-    model = sm.OLS(Y, X_mod,missing='drop')
-    res = model.fit()
-    print(f'***** {X_mod.columns.values} *****')
-    print('R2',round(res.rsquared_adj,2))
+def read_manifest(manifest_file):
+    
+    #csv with a src and a ref gpx column, one hike per row. rows starting with # are skipped.
+    #relative paths are relative to the manifest's folder
+    manifest_df = pd.read_csv(manifest_file,comment='#',skipinitialspace=True,dtype=str)
+    for col in ['src','ref']:
+        if col not in manifest_df.columns:
+            raise Exception(f'Manifest is missing the {col} column: {manifest_file}')
+    
+    manifest_dir = os.path.dirname(manifest_file)
+    return [(os.path.join(manifest_dir,src_file),os.path.join(manifest_dir,ref_file))
+            for src_file, ref_file in zip(manifest_df['src'],manifest_df['ref'])]
+
+def process_pair(src_file,ref_file,do_calibration=False,max_window=None,resolution=1,max_gap=None):
+    
+    #tracks are only split where their gpx files start a new trkseg. max_gap also splits them at every time gap
+    #longer than that many seconds, e.g. 14400 so the days of a multi-day hike are analyzed separately. src points
+    #in a ref gap are then left out instead of compared with a straight line across it
+    pe = PointExtractor.PointExtractor(stringify=False)
+    
+    src_track = pe.get_points_gpx(src_file)
+    ref_track = pe.get_points_gpx(ref_file)
+    if max_gap is not None:
+        src_track = src_track.split_gaps(max_gap)
+        ref_track = ref_track.split_gaps(max_gap)
+    
+    if len(src_track) < 2:
+        raise Exception(f'<2 points detected in src file (at least 2 are needed): {src_file}')
+    if len(ref_track) == 0:
+        raise Exception(f'0 points detected in ref file: {ref_file}')
+    
+    offset = 0
+    if do_calibration:
+        offset = calibrate_src(src_track,ref_track,max_window=max_window,resolution=resolution,
+                               name=f'{src_file} vs {ref_file}')
+    
+    #points per second over the src track, gaps between segments left out. single point segments span no time,
+    #so they are left out too
+    segment_list = [segment for segment in src_track.split_segments() if len(segment) > 1]
+    src_span = sum(segment.time[-1] - segment.time[0] for segment in segment_list)
+    if src_span == 0:
+        raise Exception(f'src points span no time outside of gaps, point density is undefined: {src_file}')
+    pt_density_src = sum(len(segment) for segment in segment_list) / src_span
+    
+    merged_df = get_merged_df(src_track,ref_track,offset)
+    
+    merged_df['pt_density_src'] = pt_density_src
+    merged_df['ele_src_var'] = np.var(merged_df['ele_src'])
+    merged_df['ele_src_std'] = np.std(merged_df['ele_src'])
+    merged_df['DOP_log'] = np.log10(merged_df['ele_src'])
+    merged_df['DOP_sqrt'] = np.sqrt(merged_df['ele_src'])
+    merged_df['DOP_squared'] = np.square(merged_df['ele_src'])
+    
+    return merged_df
+
+def run_manifest(pair_list,process_func=process_pair,workers=None,**kwargs):
+    
+    #runs process_func(src_file,ref_file,**kwargs) for every pair in a process pool (serially for workers=1)
+    #and concats the frames once, in manifest order whatever order the workers finish in.
+    #a failed pair is reported and left out instead of aborting the batch
+    frame_list = []
+    failed_list = []
+    
+    executor = None if workers == 1 else ProcessPoolExecutor(max_workers=workers)
+    try:
+        if executor is None:
+            pending_list = [(pair, None) for pair in pair_list]
+        else:
+            pending_list = [(pair, executor.submit(process_func, *pair, **kwargs)) for pair in pair_list]
+        
+        for (src_file, ref_file), future in pending_list:
+            try:
+                merged_df = process_func(src_file, ref_file, **kwargs) if future is None else future.result()
+            except Exception as e:
+                print(f'WARNING: failed to analyze <{src_file}> against <{ref_file}>: {e}')
+                failed_list.append((src_file, ref_file, e))
+                continue
+            frame_list.append(merged_df)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    
+    print(f'{len(frame_list)} of {len(pair_list)} pairs analyzed')
+    df_all = pd.concat(frame_list,ignore_index=True) if frame_list else pd.DataFrame()
+    return df_all, failed_list
+
+def stat_summary(reg,feature_list):
+    
+    #reg is a Regression over all candidate features, so only the small feature_list system is solved here
+    fit = reg.fit(feature_list)
+    print(f'***** {np.array(feature_list + [Regression.INTERCEPT])} *****')
+    print('R2',round(fit.rsquared_adj,2))
     print ('COEFS:', end=' ')
-    for param, coef in res.params.iteritems():
+    for param, coef in fit.params.items():
         print (param, round(coef,2), end=' ')
     print()
 
     #for multiple regression, run VIF test on independent vars
-    if (X_mod.shape[1] > 2):
-        for i in range(X_mod.shape[1] - 1):
-            print(f'VIF {X_mod.columns[i]}: {round(variance_inflation_factor(X_mod.values, i),2)}')
+    for feature, vif in fit.vif.items():
+        print(f'VIF {feature}: {round(vif,2)}')
+
+def analyze(manifest_file,workers=None,do_calibration=False,max_window=None,resolution=1,max_gap=None):
+    
+    #error regressions over every hike pair in the manifest
+    if max_gap is not None:
+        print(f'Splitting tracks at time gaps over {max_gap}s, src points in a ref gap are left out')
+    df_all, failed_list = run_manifest(read_manifest(manifest_file),process_pair,workers,
+                                       do_calibration=do_calibration,max_window=max_window,resolution=resolution,
+                                       max_gap=max_gap)
+    
+    feature_list = ['s_nearest_src',
+                    'd_nearest_src',
+                    'DOP_src',
+                    'ele_src_var',
+                    'ele_src_std',
+                    'pt_density_src',
+                    'ele_src',
+                    'DOP_log',
+                    'DOP_sqrt',
+                    'DOP_squared'
+        ]
+    #err target and gram matrix are computed once for every feature set below
+    reg = Regression.Regression(df_all[feature_list],get_err_df(df_all)['l1_err'])
+    
+    for dist_metric in ['s_nearest_src','d_nearest_src']:
+        for DOP_metric in ['DOP_src']: #,'DOP_log','DOP_sqrt','DOP_squared']: 
+            stat_summary(reg,[dist_metric,DOP_metric,'pt_density_src'])
+
+    for col in feature_list:
+            stat_summary(reg,[col])
+    
+    return df_all
 
 if __name__ == '__main__':
     
     do_calibration = None
+    max_window = None
+    resolution = 1
+    manifest_file = DEFAULT_MANIFEST
+    workers = None
+    max_gap = None
     
     #local shortcut for local testing
     do_calibration = False
     
     if do_calibration is None:
-        do_calibration = False
+        parser = argparse.ArgumentParser()
+        parser.add_argument('manifest_file', nargs='?', default=manifest_file, help='csv of src,ref gpx pairs')
+        parser.add_argument('--workers', type=int, default=None, help='worker processes, 1 analyzes the pairs serially')
         parser.add_argument('--calibrate', dest='do_calibration', action='store_true')
+        parser.add_argument('--max_window', type=int, default=None, help='only search calibration offsets within +/- this many seconds')
+        parser.add_argument('--resolution', type=float, default=1, help='calibration step in seconds, may be below 1')
+        parser.add_argument('--max_gap', type=int, default=None, help='also split tracks at time gaps over this many seconds, e.g. 14400')
         args = parser.parse_args()
+        do_calibration, max_window, resolution = args.do_calibration, args.max_window, args.resolution
+        manifest_file, workers, max_gap = args.manifest_file, args.workers, args.max_gap
     
-    df_all = pd.DataFrame()
-
-    for src_file, ref_file in [
-#         ('clark-local.gpx','clark-watch.gpx'),
-#         ('clark_20200427-local.gpx','clark_20200427-watch.gpx'),
-        ('gdune-local.gpx','gdune-watch.gpx'),
-#         ('mesquite-local.gpx','mesquite-watch.gpx'),
-        ('ncrater-local.gpx','ncrater-watch.gpx'),
-#         ('sundance-local.gpx','sundance-watch.gpx'),        
-        ('wasson-local.gpx','wasson-watch.gpx'),
-        ('wthumb-local.gpx','wthumb-watch.gpx')      
-    ]:
-        
-        pe = PointExtractor.PointExtractor(stringify=False)
-        
-        orig_src_df = pe.get_points_gpx(src_file) 
-        if len(orig_src_df.index) < 2:
-            raise Exception(f'<2 points detected in src file (at least 2 are needed): {src_file}')
-    
-        orig_ref_df = pe.get_points_gpx(ref_file)
-        if len(orig_ref_df.index) == 0:
-            raise Exception(f'0 points detected in ref file: {ref_file}')
-        
-        offset = 0
-        if do_calibration:
-            offset = calibrate_src(orig_src_df,orig_ref_df)
-                    
-        #interpolate src_df
-        #create entries for missing seconds
-        pt_density_src = len(orig_src_df.index) / (orig_src_df.index[-1] - orig_src_df.index[0]).total_seconds()
-        orig_src_df['nearest_pt_idx'] = range(len(orig_src_df.index))
-
-        src_df = orig_src_df.resample('1S').first()
-        #interpolate lat,lon,ele for newly created points
-        src_df[['lat','lon','ele','DOP']] = src_df[['lat','lon','ele','DOP']].interpolate(method='time',inplace=False)
-
-        src_df['nearest_pt_idx'] = src_df['nearest_pt_idx'].interpolate(method='nearest',inplace=False).astype('int64')
-        src_df['s_nearest_src'] = np.abs((orig_src_df.index[src_df['nearest_pt_idx'].values] - src_df.index).total_seconds())
-            
-        src_df['d_nearest_src'] = [haversine_dist(orig_src_df.iloc[int(row['nearest_pt_idx'])].lat,
-                                                  row['lat'],
-                                                  orig_src_df.iloc[int(row['nearest_pt_idx'])].lon,
-                                                  row['lon']
-                                    ) for idx,row in src_df.iterrows()]
-        
-        src_df.drop(columns='nearest_pt_idx',inplace=True)
-
-        #interpolate ref_df
-        #create entries for missing seconds
-        orig_ref_df['nearest_pt_idx'] = range(len(orig_ref_df.index))
-        ref_df = orig_ref_df.resample('1S').first()
-        #interpolate lat,lon,ele for newly created points
-        ref_df[['lat','lon','ele','DOP']] = ref_df[['lat','lon','ele','DOP']].interpolate(method='time',inplace=False)
-        ref_df['nearest_pt_idx'] = ref_df['nearest_pt_idx'].interpolate(method='nearest',inplace=False).astype('int64')
-        ref_df['s_nearest_ref'] = np.abs((orig_ref_df.index[ref_df['nearest_pt_idx'].values] - ref_df.index).total_seconds())
-        ref_df.drop(columns='nearest_pt_idx',inplace=True)        
-        
-        merged_df = src_df.join(ref_df,how='outer',lsuffix='_src',rsuffix='_ref')
-        src_cols = ['lat_src','lon_src','ele_src','DOP_src','s_nearest_src']
-        merged_df[src_cols] = merged_df[src_cols].shift(offset)
-        merged_df.drop(columns='DOP_ref',inplace=True)
-        merged_df.dropna(inplace=True)
-        
-        merged_df['pt_density_src'] = pt_density_src
-        merged_df['ele_src_var'] = np.var(merged_df['ele_src'])
-        merged_df['ele_src_std'] = np.std(merged_df['ele_src'])
-        merged_df['DOP_log'] = np.log10(merged_df['ele_src'])
-        merged_df['DOP_sqrt'] = np.sqrt(merged_df['ele_src'])
-        merged_df['DOP_squared'] = np.square(merged_df['ele_src'])
-        
-        df_all = df_all.append(merged_df,ignore_index=True)
-        
-#         err_df = get_err_df(merged_df)
-        
-#         print(f"Interpolated L1 err: {round(err_df['l1_err'].mean(),2)}")
-#         stat_summary(merged_df.loc[err_df.index,'s_nearest_src'],
-#                      get_err_df(merged_df)['l1_err']
-#             )
-
-#         X_ele_raw_src = merged_df['ele_src'].to_frame()
-#         X_ele_raw_src.rename(columns={'ele_src': 'ele_raw'},inplace=True)
-# 
-#         X_ele_rel_src = (merged_df['ele_src'] - np.mean(merged_df['ele_src'])).to_frame()
-#         X_ele_rel_src.rename(columns={'ele_src': 'ele_rel'},inplace=True)
-#         
-#         X_ele_relabs_src = (np.abs(merged_df['ele_src'] - np.mean(merged_df['ele_src']))).to_frame()
-#         X_ele_relabs_src.rename(columns={'ele_src': 'ele_rel_abs'},inplace=True)
-#         
-#         
-#         X_list = [X_ele_raw_src,
-#                   X_ele_rel_src,
-#                   X_ele_relabs_src]
-#         
-#         for X in X_list:
-#             
-#             df_comb = pd.concat([X,X_s_nearest_src],axis=1)
-#             model = sm.OLS(err_df['l1_err'], df_comb,missing='drop')
-#             results = model.fit()
-#             print(results.summary())
-#                         
-#         f, (ax1,ax2) = plt.subplots(nrows=2, ncols=1)
-#         default_x_size, default_y_size = pylab.gcf().get_size_inches()
-#         pylab.gcf().set_size_inches( (default_x_size * 2.75, default_y_size * 1.5) )
-#         
-#         ax1.scatter(merged_df.loc[err_df.index,'s_nearest_src'],err_df['l1_err'],s=1)
-    for dist_metric in ['s_nearest_src','d_nearest_src']:
-        for DOP_metric in ['DOP_src']: #,'DOP_log','DOP_sqrt','DOP_squared']: 
-            stat_summary(df_all[[dist_metric,DOP_metric,'pt_density_src']],
-                         get_err_df(df_all)['l1_err'] 
-                 )
-
-    for col in ['s_nearest_src',
-                'd_nearest_src',
-                'DOP_src',
-                'ele_src_var',
-                'ele_src_std',
-                'pt_density_src',
-                'ele_src',
-                'DOP_log',
-                'DOP_sqrt',
-                'DOP_squared'
-        ]:
-            stat_summary(df_all[col],
-                         get_err_df(df_all)['l1_err'] 
-                 )
-          
-#             ax2.scatter(merged_df.loc[err_df.index,'s_nearest_ref'],err_df['l1_err'],s=1)  
-            
-#             ax1.scatter(err_df.index,err_df['l1_err'])   
-#             ax1.set_xlim(err_df.index[0],err_df.index[-1])
-#             for pt in orig_src_df.index:
-#                 ax1.axvline(x=pt, color='orange', linestyle='dashed')
-            
-#             plt.show()   
-                
-            
-#             plt.hist(err_df['l1_err'],bins=20)
-#             #set y-axis as pct tot
-#             plt.gca().yaxis.set_major_formatter(PercentFormatter(len(err_df.index)))
-#             plt.show()
-            
-    
-    
\ No newline at end of file
+    analyze(manifest_file,workers,do_calibration,max_window,resolution,max_gap)
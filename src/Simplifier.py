@@ -0,0 +1,82 @@
+#installed packages
+import numpy as np
+
+#local packages
+import Geo
+import Metrics
+
+def segment_dist(x, y, x1, y1, x2, y2):
+
+    #distance from each point to the segment between (x1,y1) and (x2,y2). a zero length segment is a single point
+    dx = x2 - x1
+    dy = y2 - y1
+    sq_len = np.square(dx) + np.square(dy)
+    safe_sq_len = np.where(sq_len > 0, sq_len, 1)
+    t = np.clip(((x - x1) * dx + (y - y1) * dy) / safe_sq_len, 0, 1)
+    t = np.where(sq_len > 0, t, 0)
+    return np.hypot(x - (x1 + t * dx), y - (y1 + t * dy))
+
+def douglas_peucker(x, y, tolerance):
+
+    #returns (keep mask, max distance of a dropped point from the simplified line).
+    #all open segments of a recursion level are split in one vectorized pass, so a level is O(n). a typical track
+    #needs O(log n) levels, but one where every split only peels off an end point, e.g. a monotone spiral, needs
+    #n levels, O(n^2) in all like the recursive version. the first and last points are always kept
+    n_points = len(x)
+    keep = np.zeros(n_points, dtype=bool)
+    keep[[0, -1] if n_points else []] = True
+    max_deviation = 0.0
+
+    seg_start = np.array([0], dtype=np.int64)
+    seg_end = np.array([n_points - 1], dtype=np.int64)
+    while True:
+        counts = seg_end - seg_start - 1
+        has_interior = counts > 0
+        seg_start, seg_end, counts = seg_start[has_interior], seg_end[has_interior], counts[has_interior]
+        if len(seg_start) == 0:
+            break
+
+        #interior points of every open segment, concatenated segment by segment
+        seg_offset = np.cumsum(counts) - counts
+        seg_id = np.repeat(np.arange(len(seg_start)), counts)
+        pt = np.arange(counts.sum()) - seg_offset[seg_id] + seg_start[seg_id] + 1
+        dist = segment_dist(x[pt], y[pt], x[seg_start[seg_id]], y[seg_start[seg_id]], x[seg_end[seg_id]], y[seg_end[seg_id]])
+
+        #farthest interior point per segment, ties go to the first
+        seg_max = np.maximum.reduceat(dist, seg_offset)
+        is_max = np.flatnonzero(dist == seg_max[seg_id])
+        is_max = is_max[np.r_[True, seg_id[is_max[1:]] != seg_id[is_max[:-1]]]]
+        split_pt = pt[is_max]
+
+        split = seg_max > tolerance
+        if not split.all():
+            max_deviation = max(max_deviation, float(seg_max[~split].max()))
+        keep[split_pt[split]] = True
+        seg_start, seg_end = (np.concatenate([seg_start[split], split_pt[split]]),
+                              np.concatenate([split_pt[split], seg_end[split]]))
+
+    return keep, max_deviation
+
+def simplify_track(track, tolerance):
+
+    #drops points that lie within tolerance metres of the line through the kept ones. kept points keep all their
+    #columns, timestamps included. positions are projected to metres like Geo.flat_sq_dist, fine over a hike
+    if len(track) < 3:
+        return track
+
+    #segments are simplified separately, so both ends of every segment are kept
+    deg_lon_dist = Geo.get_lon_width(np.median(track.lat))
+    keep_list = []
+    max_deviation = 0.0
+    with Metrics.timer('simplify', len(track)):
+        for segment in track.split_segments():
+            keep, deviation = douglas_peucker(segment.lon * deg_lon_dist, segment.lat * Geo.DEG_LAT_DIST, tolerance)
+            keep_list.append(keep)
+            max_deviation = max(max_deviation, deviation)
+    keep = np.concatenate(keep_list)
+    simplified_track = track.take(np.flatnonzero(keep))
+
+    print(f'Simplified track at {tolerance}m tolerance: {len(track)} -> {len(simplified_track)} points ' \
+          f'({round((1 - len(simplified_track) / len(track)) * 100,2)}% smaller), ' \
+          f'max deviation {round(max_deviation,2)}m')
+    return simplified_track
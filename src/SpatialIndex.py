@@ -0,0 +1,215 @@
+#installed packages
+import numpy as np
+
+#local packages
+import Geo
+
+#by default a grid cell spans about this many consecutive track points
+POINTS_PER_CELL = 8
+#cell edge in metres used when the point spacing can't be measured, e.g. a single point
+DEFAULT_CELL_SIZE = 25
+#max number of (query, point) or (query cell, cell) pairs compared at once, bounds peak memory
+PAIR_BATCH_SIZE = 2**22
+#rings searched around each query before the queries still open switch to pruning whole cells, see far_nearest
+MAX_RINGS = 3
+
+def ring_offsets(ring):
+
+    #cell offsets at chebyshev distance ring from the center cell
+    if ring == 0:
+        return np.zeros(1, dtype=np.int64), np.zeros(1, dtype=np.int64)
+    side = np.arange(-ring, ring + 1)
+    inner = np.arange(-ring + 1, ring)
+    dx = np.concatenate([side, side, np.full(len(inner), -ring), np.full(len(inner), ring)])
+    dy = np.concatenate([np.full(len(side), -ring), np.full(len(side), ring), inner, inner])
+    return dx, dy
+
+def group_offsets(counts):
+
+    #position of every element within its group, for groups of the given sizes laid out back to back
+    return np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+class SpatialIndex:
+
+    #uniform grid over a track's points, matching points by position regardless of their timestamps.
+    #points are projected to metres on the same flat approximation as Geo.flat_sq_dist, which holds over
+    #the extent of a hike, and sorted by cell so each cell is one contiguous slice.
+    #queries are batched: every query still searching examines its next ring of cells in the same pass
+
+    def __init__(self, lat, lon, cell_size=None):
+
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        if len(lat) == 0:
+            raise Exception('Cannot index a track without points')
+
+        self.deg_lon_dist = Geo.get_lon_width(np.median(lat))
+        x, y = self.project(lat, lon)
+
+        #size cells to the median spacing of consecutive points, so each cell holds a handful of them
+        if cell_size is None:
+            step = np.hypot(np.diff(x), np.diff(y))
+            step = step[step > 0]
+            cell_size = POINTS_PER_CELL * np.median(step) if len(step) else DEFAULT_CELL_SIZE
+        self.cell_size = cell_size
+
+        cx, cy = self.cell_coords(x, y)
+        self.cx_min, self.cx_max = cx.min(), cx.max()
+        self.cy_min, self.cy_max = cy.min(), cy.max()
+        self.n_cy = self.cy_max - self.cy_min + 1
+
+        keys = (cx - self.cx_min) * self.n_cy + (cy - self.cy_min)
+        self.idx = np.argsort(keys, kind='stable')
+        self.x = x[self.idx]
+        self.y = y[self.idx]
+        self.cell_keys, self.cell_start, self.cell_count = np.unique(keys[self.idx], return_index=True, return_counts=True)
+        self.cell_cx = self.cell_keys // self.n_cy + self.cx_min
+        self.cell_cy = self.cell_keys % self.n_cy + self.cy_min
+
+    @classmethod
+    def from_track(cls, track, cell_size=None):
+        return cls(track.lat, track.lon, cell_size)
+
+    def __len__(self):
+        return len(self.idx)
+
+    def project(self, lat, lon):
+        return np.asarray(lon) * self.deg_lon_dist, np.asarray(lat) * Geo.DEG_LAT_DIST
+
+    def cell_coords(self, x, y):
+        return np.floor(x / self.cell_size).astype(np.int64), np.floor(y / self.cell_size).astype(np.int64)
+
+    def cell_points(self, query_idx, cell_pos):
+
+        #expands (query, occupied cell) pairs into (query, sorted point position) pairs for every point in the cell
+        counts = self.cell_count[cell_pos]
+        return np.repeat(query_idx, counts), np.repeat(self.cell_start[cell_pos], counts) + group_offsets(counts)
+
+    def gather(self, query_idx, cx, cy):
+
+        #(query, sorted point position) pairs for the points in cell (cx, cy) of each query, empty cells are skipped
+        in_grid = (cx >= self.cx_min) & (cx <= self.cx_max) & (cy >= self.cy_min) & (cy <= self.cy_max)
+        query_idx, cx, cy = query_idx[in_grid], cx[in_grid], cy[in_grid]
+
+        keys = (cx - self.cx_min) * self.n_cy + (cy - self.cy_min)
+        cell_pos = np.minimum(np.searchsorted(self.cell_keys, keys), len(self.cell_keys) - 1)
+        found = self.cell_keys[cell_pos] == keys
+        return self.cell_points(query_idx[found], cell_pos[found])
+
+    def update_nearest(self, query_idx, point_pos, qx, qy, best_sq_dist, best_pos):
+
+        #query_idx must be grouped, i.e. all pairs of a query next to each other, as gather returns them
+        if len(query_idx) == 0:
+            return
+        sq_dist = np.square(self.x[point_pos] - qx[query_idx]) + np.square(self.y[point_pos] - qy[query_idx])
+
+        #closest candidate per query group, ties go to the first candidate
+        group_start = np.flatnonzero(np.r_[True, query_idx[1:] != query_idx[:-1]])
+        group_min = np.minimum.reduceat(sq_dist, group_start)
+        is_min = sq_dist == np.repeat(group_min, np.diff(np.r_[group_start, len(sq_dist)]))
+        first_min = np.flatnonzero(is_min)
+        first_min = first_min[np.r_[True, query_idx[first_min[1:]] != query_idx[first_min[:-1]]]]
+        query_idx, point_pos, sq_dist = query_idx[first_min], point_pos[first_min], sq_dist[first_min]
+
+        better = sq_dist < best_sq_dist[query_idx]
+        best_sq_dist[query_idx[better]] = sq_dist[better]
+        best_pos[query_idx[better]] = point_pos[better]
+
+    def far_nearest(self, query_idx, qcx, qcy, qx, qy, best_sq_dist, best_pos):
+
+        #queries far from every point, e.g. interpolated across the night between two days of a hike, would need
+        #many rings. instead each query cell is checked against every occupied cell at once: a cell can only hold
+        #the nearest point if its box is no further from the query cell than the far corner of the closest
+        #occupied cell. that leaves a thin shell of cells, shared by all queries in the query cell
+        n_qcy = qcy.max() - qcy.min() + 1
+        query_keys, query_cell_idx = np.unique((qcx - qcx.min()) * n_qcy + (qcy - qcy.min()), return_inverse=True)
+        query_cells = np.stack([query_keys // n_qcy + qcx.min(), query_keys % n_qcy + qcy.min()], axis=1)
+        order = np.argsort(query_cell_idx, kind='stable')
+        query_idx, query_cell_idx = query_idx[order], query_cell_idx[order]
+        cell_query_start = np.searchsorted(query_cell_idx, np.arange(len(query_cells) + 1))
+
+        batch_size = max(1, PAIR_BATCH_SIZE // len(self.cell_keys))
+        for start in range(0, len(query_cells), batch_size):
+            batch = query_cells[start:start + batch_size]
+
+            #closest and farthest distance between the boxes of two cells, in cells
+            gap_x = np.abs(batch[:, :1] - self.cell_cx)
+            gap_y = np.abs(batch[:, 1:] - self.cell_cy)
+            min_sq_gap = np.square(np.maximum(gap_x - 1, 0)) + np.square(np.maximum(gap_y - 1, 0))
+            max_sq_gap = np.square(gap_x + 1) + np.square(gap_y + 1)
+            cand_row, cand_pos = np.nonzero(min_sq_gap <= max_sq_gap.min(axis=1, keepdims=True))
+
+            cand_count = np.bincount(cand_row, minlength=len(batch))
+            cand_start = np.cumsum(cand_count) - cand_count
+            cand_points = np.bincount(cand_row, weights=self.cell_count[cand_pos], minlength=len(batch))
+
+            #pair each query with every candidate cell of its query cell, a chunk of queries at a time
+            query_start, query_end = cell_query_start[start], cell_query_start[start + len(batch)]
+            chunk_size = max(1, int(PAIR_BATCH_SIZE // cand_points.max()))
+            for chunk_start in range(query_start, query_end, chunk_size):
+                chunk = slice(chunk_start, min(chunk_start + chunk_size, query_end))
+                rows = query_cell_idx[chunk] - start
+                counts = cand_count[rows]
+                pair_cell = cand_pos[np.repeat(cand_start[rows], counts) + group_offsets(counts)]
+                self.update_nearest(*self.cell_points(np.repeat(query_idx[chunk], counts), pair_cell),
+                                    qx, qy, best_sq_dist, best_pos)
+
+    def nearest(self, lat, lon):
+
+        #returns (index of the nearest track point, distance in metres) for every query point.
+        #nan queries get index -1 and distance nan
+        qx, qy = self.project(lat, lon)
+        qx, qy = np.atleast_1d(qx).astype(np.float64), np.atleast_1d(qy).astype(np.float64)
+        best_sq_dist = np.full(len(qx), np.inf)
+        best_pos = np.full(len(qx), -1, dtype=np.int64)
+
+        query_idx = np.flatnonzero(~(np.isnan(qx) | np.isnan(qy)))
+        qcx = np.zeros(len(qx), dtype=np.int64)
+        qcy = np.zeros(len(qx), dtype=np.int64)
+        qcx[query_idx], qcy[query_idx] = self.cell_coords(qx[query_idx], qy[query_idx])
+
+        #queries outside the grid start at the first ring that reaches it
+        start_ring = np.maximum.reduce([self.cx_min - qcx, qcx - self.cx_max, self.cy_min - qcy, qcy - self.cy_max,
+                                        np.zeros(len(qx), dtype=np.int64)])
+
+        active = query_idx
+        for ring in range(MAX_RINGS + 1):
+            ring_active = active[start_ring[active] <= ring]
+            if len(ring_active):
+                dx, dy = ring_offsets(ring)
+                pair_idx = np.repeat(ring_active, len(dx))
+                self.update_nearest(*self.gather(pair_idx, qcx[pair_idx] + np.tile(dx, len(ring_active)),
+                                                 qcy[pair_idx] + np.tile(dy, len(ring_active))),
+                                    qx, qy, best_sq_dist, best_pos)
+
+            #points in rings further out are at least ring * cell_size away
+            active = active[best_sq_dist[active] > np.square(ring * self.cell_size)]
+
+        if len(active):
+            self.far_nearest(active, qcx[active], qcy[active], qx, qy, best_sq_dist, best_pos)
+
+        found = best_pos >= 0
+        return np.where(found, self.idx[best_pos], -1), np.where(found, np.sqrt(best_sq_dist), np.nan)
+
+    def within(self, lat, lon, radius):
+
+        #returns (query index, track point index) pairs for every track point within radius metres of a query point,
+        #ordered by query and then by distance
+        qx, qy = self.project(lat, lon)
+        qx, qy = np.atleast_1d(qx).astype(np.float64), np.atleast_1d(qy).astype(np.float64)
+        active = np.flatnonzero(~(np.isnan(qx) | np.isnan(qy)))
+        qcx, qcy = self.cell_coords(qx[active], qy[active])
+
+        n_rings = int(np.ceil(radius / self.cell_size))
+        dx, dy = np.meshgrid(np.arange(-n_rings, n_rings + 1), np.arange(-n_rings, n_rings + 1))
+        dx, dy = dx.ravel(), dy.ravel()
+
+        query_idx, point_pos = self.gather(np.repeat(active, len(dx)),
+                                           np.repeat(qcx, len(dx)) + np.tile(dx, len(active)),
+                                           np.repeat(qcy, len(dx)) + np.tile(dy, len(active)))
+        sq_dist = np.square(self.x[point_pos] - qx[query_idx]) + np.square(self.y[point_pos] - qy[query_idx])
+        in_radius = sq_dist <= radius**2
+        query_idx, point_pos, sq_dist = query_idx[in_radius], point_pos[in_radius], sq_dist[in_radius]
+
+        order = np.lexsort((sq_dist, query_idx))
+        return query_idx[order], self.idx[point_pos[order]]
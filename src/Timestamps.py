@@ -0,0 +1,122 @@
+#installed packages
+import numpy as np
+
+#local packages
+from Track import NAT
+
+#batch timestamp parsing. whole columns of strings are converted to int64 epoch seconds (UTC) in one vectorized
+#pass over their characters, instead of a split/datetime/timedelta round trip per point. layouts:
+#   exif: '2019:02:14 06:28:54', also used by drive's imageMediaMetadata.time. local time, see utc_zone
+#   iso:  '2019-02-14T06:28:54.000Z', as in gpx files. an optional Z or +hh:mm/-hh:mm offset is applied
+#sub-second digits are dropped. None, or a string that doesn't fit the layout (e.g. exif's '0000:00:00 00:00:00'
+#placeholder) parses to NAT, so callers can skip those points
+
+#(start, stop) character positions of year, month, day, hour, minute and second, the same in both layouts
+FIELD_POS = ((0, 4), (5, 7), (8, 10), (11, 13), (14, 16), (17, 19))
+DAYS_IN_MONTH = np.array([0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+#code points of the separators
+COLON, DASH, PLUS, DOT, SPACE, T, Z = (ord(char) for char in ':-+. TZ')
+#strings parsed per pass, bounds the size of the character matrix
+BATCH_SIZE = 2**16
+#room after the seconds for a zero column and a '+hh:mm' offset, so lookups past the end stay in the matrix
+SUFFIX_PAD = 8
+
+def to_char_matrix(datetime_list):
+
+    #code points of every string, one zero padded row per string. surrounding whitespace is stripped, like the
+    #padding xml allows around an xs:dateTime, e.g. '<time>\n  2019-02-14T06:29:54Z\n</time>'
+    str_arr = np.array(['' if datetime is None else datetime.strip() for datetime in datetime_list], dtype=str)
+    width = str_arr.dtype.itemsize // 4
+    chars = np.zeros((len(str_arr), max(width, FIELD_POS[-1][1]) + SUFFIX_PAD), dtype=np.int32)
+    chars[:, :width] = str_arr.view(np.uint32).reshape(len(str_arr), width)
+    return chars, (chars != 0).sum(axis=1)
+
+def digits_at(chars, pos, n_digits):
+
+    #(value, valid) of the n_digits decimal digits starting at pos in each row. pos is a column or an array per row
+    rows = np.arange(len(chars))
+    value = np.zeros(len(chars), dtype=np.int64)
+    valid = np.ones(len(chars), dtype=bool)
+    for i in range(n_digits):
+        digit = chars[rows, pos + i].astype(np.int64) - ord('0')
+        valid &= (digit >= 0) & (digit <= 9)
+        value = value * 10 + digit
+    return value, valid
+
+def days_from_civil(year, month, day):
+
+    #days since 1970-01-01 of a proleptic gregorian date, vectorized (Howard Hinnant's algorithm)
+    year = year - (month <= 2)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+def parse_chars(chars, lengths, date_sep, time_sep_list, allow_offset):
+
+    field_list = [digits_at(chars, start, stop - start) for start, stop in FIELD_POS]
+    (year, month, day, hour, minute, second) = (value for value, _ in field_list)
+    valid = np.logical_and.reduce([field_valid for _, field_valid in field_list])
+
+    valid &= (chars[:, 4] == date_sep) & (chars[:, 7] == date_sep) & np.isin(chars[:, 10], time_sep_list)
+    valid &= (chars[:, 13] == COLON) & (chars[:, 16] == COLON)
+
+    is_leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    valid &= (month >= 1) & (month <= 12) & (day >= 1) & (day <= DAYS_IN_MONTH[np.clip(month, 0, 12)])
+    valid &= ~((month == 2) & (day == 29) & ~is_leap)
+    valid &= (hour < 24) & (minute < 60) & (second < 60)
+
+    epoch = days_from_civil(year, month, day) * 86400 + hour * 3600 + minute * 60 + second
+
+    #optional fraction after the seconds, e.g. '.000'. the matrix ends in zero columns, so every row has a non digit
+    positions = np.arange(chars.shape[1])
+    is_digit = (chars >= ord('0')) & (chars <= ord('9'))
+    has_fraction = chars[:, 19] == DOT
+    suffix_start = np.where(has_fraction, np.argmax((positions > 19) & ~is_digit, axis=1), 19)
+    suffix_len = lengths - suffix_start
+
+    if not allow_offset:
+        valid &= suffix_len == 0
+    else:
+        #Z, +hh, +hhmm or +hh:mm (or -) after the seconds, no suffix is taken as UTC
+        rows = np.arange(len(chars))
+        sign_char = chars[rows, suffix_start]
+        sign = np.where(sign_char == PLUS, 1, np.where(sign_char == DASH, -1, 0))
+        has_colon = chars[rows, suffix_start + 3] == COLON
+        offset_hour, hour_valid = digits_at(chars, suffix_start + 1, 2)
+        offset_minute, minute_valid = digits_at(chars, suffix_start + np.where(has_colon, 4, 3), 2)
+        offset_minute = np.where(suffix_len == 3, 0, offset_minute)
+        minute_valid |= suffix_len == 3
+
+        has_offset = (sign != 0) & hour_valid & minute_valid & (offset_hour < 24) & (offset_minute < 60) & \
+                     ((suffix_len == 3) | ((suffix_len == 5) & ~has_colon) | ((suffix_len == 6) & has_colon))
+        valid &= (suffix_len == 0) | ((suffix_len == 1) & (sign_char == Z)) | has_offset
+        epoch -= np.where(has_offset, sign * (offset_hour * 3600 + offset_minute * 60), 0)
+
+    return np.where(valid, epoch, NAT)
+
+def parse(datetime_list, date_sep, time_sep_list, allow_offset):
+
+    time = np.full(len(datetime_list), NAT, dtype=np.int64)
+    for start in range(0, len(datetime_list), BATCH_SIZE):
+        chars, lengths = to_char_matrix(datetime_list[start:start + BATCH_SIZE])
+        time[start:start + len(chars)] = parse_chars(chars, lengths, date_sep, time_sep_list, allow_offset)
+    return time
+
+def parse_exif(datetime_list, utc_zone=0):
+
+    #exif and drive timestamps are local time. utc_zone is its offset from UTC in hours, e.g. -4
+    time = parse(list(datetime_list), COLON, [SPACE], allow_offset=False)
+    return np.where(time != NAT, time - int(round(utc_zone * 3600)), NAT)
+
+def parse_iso(datetime_list):
+
+    #a space between date and time is accepted too, like pandas does
+    return parse(list(datetime_list), DASH, [T, SPACE], allow_offset=True)
+
+def format_iso(time):
+
+    #gpx timestamps of int64 epoch seconds, e.g. '2019-02-14T06:28:54.000Z'. NAT formats as None
+    return [None if datetime == 'NaT' else datetime + '.000Z'
+            for datetime in np.datetime_as_string(np.asarray(time).astype('datetime64[s]')).tolist()]
@@ -0,0 +1,170 @@
+#std packages
+import os
+
+#installed packages
+import numpy as np
+
+#names of the ele/DOP columns, e.g. for Interpolator.col
+ELE = 'ele'
+DOP = 'DOP'
+
+#epoch value used for points without a timestamp
+NAT = np.iinfo(np.int64).min
+
+#file name prefix of extension columns written by Track.save
+EXTRA_PREFIX = 'extra_'
+
+def to_epoch(datetime_list):
+
+    #accepts datetime objects or gpx style strings, e.g. '2019-02-14T06:28:54.000Z'. sub-second precision and the tz suffix are dropped
+    datetime_list = [datetime[:19] if isinstance(datetime, str) else datetime for datetime in datetime_list]
+    return np.array(datetime_list, dtype='datetime64[s]').astype(np.int64)
+
+class Track:
+
+    #columnar point storage shared by the extractors, GPXWriter and RouteAnalyzer.
+    #times are int64 seconds since the epoch (UTC), lat/lon float64, ele/DOP float32 with nan for missing values.
+    #extra holds optional per-point extension columns by name.
+    #segment numbers each point's gpx trkseg. consecutive points with the same number form one segment, nothing
+    #is interpolated between segments, e.g. across the night between two days of a hike
+
+    def __init__(self, time, lat, lon, ele=None, dop=None, extra=None, segment=None):
+
+        self.time = np.ascontiguousarray(time, dtype=np.int64)
+        self.lat  = np.ascontiguousarray(lat,  dtype=np.float64)
+        self.lon  = np.ascontiguousarray(lon,  dtype=np.float64)
+
+        n_points = len(self.time)
+        self.ele = np.full(n_points, np.nan, dtype=np.float32) if ele is None else np.ascontiguousarray(ele, dtype=np.float32)
+        self.dop = np.full(n_points, np.nan, dtype=np.float32) if dop is None else np.ascontiguousarray(dop, dtype=np.float32)
+        self.extra = {} if extra is None else {name: np.ascontiguousarray(col) for name, col in extra.items()}
+        self.segment = np.zeros(n_points, dtype=np.int32) if segment is None else np.ascontiguousarray(segment, dtype=np.int32)
+
+        for col in [self.lat, self.lon, self.ele, self.dop, self.segment] + list(self.extra.values()):
+            if len(col) != n_points:
+                raise Exception(f'Track columns must all have {n_points} points, got {len(col)}')
+
+    def __len__(self):
+        return len(self.time)
+
+    @classmethod
+    def from_points(cls, point_list, time=None):
+
+        #point tuples are (datetime, lat, lon, ele, DOP) as returned by the standardize_* methods. ele/DOP may be None.
+        #time, e.g. from a Timestamps batch parse, replaces the tuples' datetimes
+        if len(point_list) == 0:
+            return cls([], [], [])
+
+        datetime_list, lat_list, lon_list, ele_list, dop_list = zip(*point_list)
+        return cls(to_epoch(datetime_list) if time is None else time,
+                   np.array(lat_list, dtype=np.float64),
+                   np.array(lon_list, dtype=np.float64),
+                   np.array([np.nan if ele is None else ele for ele in ele_list], dtype=np.float32),
+                   np.array([np.nan if dop is None else dop for dop in dop_list], dtype=np.float32))
+
+    def save(self, path):
+
+        #one .npy file per column in the folder path, so load can memory map each column without copying.
+        #each file is replaced atomically, so a reader never maps a half written column
+        os.makedirs(path, exist_ok=True)
+        col_dict = {'time': self.time, 'lat': self.lat, 'lon': self.lon, 'ele': self.ele, 'dop': self.dop, 'segment': self.segment}
+        col_dict.update({EXTRA_PREFIX + name: col for name, col in self.extra.items()})
+
+        for name, col in col_dict.items():
+            tmp_file = os.path.join(path, f'{name}.{os.getpid()}.tmp')
+            with open(tmp_file, 'wb') as f:
+                np.save(f, col)
+            os.replace(tmp_file, os.path.join(path, name + '.npy'))
+
+        #drop extension columns left over from an earlier save
+        for file_name in os.listdir(path):
+            if file_name.startswith(EXTRA_PREFIX) and file_name.endswith('.npy') and file_name[:-4] not in col_dict:
+                os.remove(os.path.join(path, file_name))
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+
+        #mmap_mode='r' maps the columns read-only, so processes loading the same track share its pages.
+        #tracks saved before segments were kept have no segment column and load as one segment
+        def load_col(name):
+            col_file = os.path.join(path, name + '.npy')
+            return np.load(col_file, mmap_mode=mmap_mode) if name != 'segment' or os.path.exists(col_file) else None
+
+        extra_names = [file_name[len(EXTRA_PREFIX):-4] for file_name in sorted(os.listdir(path))
+                       if file_name.startswith(EXTRA_PREFIX) and file_name.endswith('.npy')]
+        return cls(load_col('time'), load_col('lat'), load_col('lon'), load_col('ele'), load_col('dop'),
+                   {name: load_col(EXTRA_PREFIX + name) for name in extra_names}, load_col('segment'))
+
+    def datetimes(self):
+        return self.time.astype('datetime64[s]')
+
+    def take(self, idx):
+
+        #a slice keeps every column a view, e.g. of a memory mapped track
+        return Track(self.time[idx], self.lat[idx], self.lon[idx], self.ele[idx], self.dop[idx],
+                     {name: col[idx] for name, col in self.extra.items()}, self.segment[idx])
+
+    def segment_starts(self):
+
+        #index of the first point of every segment, plus len(self) to close the last one
+        return np.r_[np.flatnonzero(np.r_[len(self) > 0, self.segment[1:] != self.segment[:-1]]), len(self)]
+
+    def split_segments(self):
+
+        #one view per segment, so a long trip can be processed a segment at a time
+        starts = self.segment_starts()
+        return [self.take(slice(start, stop)) for start, stop in zip(starts[:-1], starts[1:])]
+
+    def split_gaps(self, max_gap):
+
+        #same points, with a new segment also starting after every time gap longer than max_gap seconds
+        new_segment = np.r_[False, (self.segment[1:] != self.segment[:-1]) | (np.diff(self.time) > max_gap)]
+        return Track(self.time, self.lat, self.lon, self.ele, self.dop, self.extra, np.cumsum(new_segment)[:len(self)])
+
+    def sort(self):
+
+        #stable so points with the same timestamp keep their input order
+        return self.take(np.argsort(self.time, kind='stable'))
+
+    def merge(self, other):
+
+        #both tracks sorted, returns the sorted union in one pass. at equal times this track's points come first.
+        #segment numbers are kept as they are
+        other_pos = np.searchsorted(self.time, other.time, side='right') + np.arange(len(other))
+        is_other = np.zeros(len(self) + len(other), dtype=bool)
+        is_other[other_pos] = True
+
+        def merge_col(col, other_col):
+            merged = np.empty(len(is_other), dtype=np.result_type(col, other_col))
+            merged[~is_other] = col
+            merged[is_other] = other_col
+            return merged
+
+        extra_names = set(self.extra) & set(other.extra)
+        return Track(merge_col(self.time, other.time), merge_col(self.lat, other.lat), merge_col(self.lon, other.lon),
+                     merge_col(self.ele, other.ele), merge_col(self.dop, other.dop),
+                     {name: merge_col(self.extra[name], other.extra[name]) for name in extra_names},
+                     merge_col(self.segment, other.segment))
+
+    @classmethod
+    def concat(cls, track_list):
+
+        if len(track_list) == 0:
+            return cls([], [], [])
+
+        #only extension columns present in every track are kept.
+        #segments are renumbered, so each track's segments stay separate from the others'
+        extra_names = set.intersection(*[set(track.extra) for track in track_list])
+        segment_list = []
+        segment_offset = 0
+        for track in track_list:
+            segment_list.append(track.segment - (track.segment.min() if len(track) else 0) + segment_offset)
+            if len(track):
+                segment_offset = segment_list[-1].max() + 1
+        return cls(np.concatenate([track.time for track in track_list]),
+                   np.concatenate([track.lat  for track in track_list]),
+                   np.concatenate([track.lon  for track in track_list]),
+                   np.concatenate([track.ele  for track in track_list]),
+                   np.concatenate([track.dop  for track in track_list]),
+                   {name: np.concatenate([track.extra[name] for track in track_list]) for name in extra_names},
+                   np.concatenate(segment_list))
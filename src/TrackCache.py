@@ -0,0 +1,51 @@
+#std packages
+import json
+import os
+
+#local packages
+from Track import Track
+
+#parsed gpx tracks are cached in a folder next to the file, e.g. wasson-watch.gpx-cache
+TRACK_CACHE_SUFFIX = '-cache'
+KEY_FILE = 'key.json'
+#bump when the cached columns change meaning, so old caches are re-parsed
+FORMAT_VERSION = 3
+
+def get_path(src_file):
+    return src_file + TRACK_CACHE_SUFFIX
+
+def get_key(src_file):
+
+    #like PhotoCache, a cache entry is valid while the source's size and mtime are unchanged
+    stat = os.stat(src_file)
+    return {'version': FORMAT_VERSION, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def load(src_file, mmap_mode='r'):
+
+    #returns the cached track, memory mapped, or None if there is no valid cache for src_file
+    path = get_path(src_file)
+    try:
+        with open(os.path.join(path, KEY_FILE)) as f:
+            key = json.load(f)
+        if key != get_key(src_file):
+            return None
+        return Track.load(path, mmap_mode)
+    except (OSError, ValueError):
+        return None
+
+def store(src_file, track, key):
+
+    #key should be taken before src_file is parsed, so a file changed mid-parse isn't cached as current.
+    #the key file is removed first and written last, so it only exists next to a complete set of columns
+    path = get_path(src_file)
+    key_file = os.path.join(path, KEY_FILE)
+    try:
+        if os.path.exists(key_file):
+            os.remove(key_file)
+        track.save(path)
+        tmp_file = os.path.join(path, f'{KEY_FILE}.{os.getpid()}.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump(key, f)
+        os.replace(tmp_file, key_file)
+    except OSError as e:
+        print(f'WARNING: could not cache track of <{src_file}>: {e}')
@@ -0,0 +1,184 @@
+#std packages
+import argparse
+import contextlib
+import datetime as dt
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+#installed packages
+import numpy as np
+
+#local packages
+import GPXWriter
+import Interpolator
+import PointExtractor
+import Regression
+import RouteAnalyzer
+from Track import Track
+
+#times each processing stage on the bundled gpx pairs, scaled up synthetically, and saves the timings as json, e.g.
+#   python benchmark.py --scales 1 10 100 --out before.json
+#so runs on different commits can be compared offline
+
+SEED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'assets', 'gpx_misc')
+
+DAY = 24 * 60 * 60
+#each scaled copy of a track is moved this many degrees north, so copies don't lie on top of each other
+COPY_LAT_SHIFT = 0.01
+
+#features regressed on in the feature stage, the ones RouteAnalyzer.analyze summarizes
+FEATURE_LIST = ['s_nearest_src', 'd_nearest_src', 'DOP_src', 'pt_density_src', 'ele_src']
+
+def scale_pair(src_track, ref_track, scale):
+
+    #scale copies of both tracks, one per day (or per several days for longer hikes), so the result spans scale days.
+    #both tracks use the same period, so their clocks stay aligned
+    span = max(src_track.time[-1], ref_track.time[-1]) - min(src_track.time[0], ref_track.time[0])
+    period = DAY * (span // DAY + 1)
+
+    def scale_track(track):
+        return Track.concat([Track(track.time + i * period, track.lat + i * COPY_LAT_SHIFT, track.lon, track.ele, track.dop)
+                             for i in range(scale)])
+
+    return scale_track(src_track), scale_track(ref_track)
+
+def to_dms(deg):
+
+    #exif gps coordinates are (degrees, minutes, seconds) rationals
+    from PIL.TiffImagePlugin import IFDRational
+
+    deg = abs(deg)
+    minutes = (deg - int(deg)) * 60
+    seconds = (minutes - int(minutes)) * 60
+    return (IFDRational(int(deg)), IFDRational(int(minutes)), IFDRational(int(round(seconds * 10000)), 10000))
+
+def make_photos(track, photo_dir):
+
+    #one small jpeg per track point, with the point's time (as utc local time), position, ele and DOP in its exif
+    import PIL.Image
+    from PIL.TiffImagePlugin import IFDRational
+
+    image = PIL.Image.new('RGB', (16, 16))
+    for i, (datetime, lat, lon, ele, dop) in enumerate(zip(track.datetimes().tolist(), track.lat, track.lon, track.ele, track.dop)):
+        exif = PIL.Image.Exif()
+        exif.get_ifd(0x8769)[36867] = datetime.strftime('%Y:%m:%d %H:%M:%S')
+        gps = exif.get_ifd(0x8825)
+        gps[1] = 'N' if lat >= 0 else 'S'
+        gps[2] = to_dms(lat)
+        gps[3] = 'E' if lon >= 0 else 'W'
+        gps[4] = to_dms(lon)
+        if not np.isnan(ele):
+            gps[5] = b'\x00' if ele >= 0 else b'\x01'
+            gps[6] = IFDRational(int(round(abs(float(ele)) * 100)), 100)
+        if not np.isnan(dop):
+            gps[11] = IFDRational(int(round(float(dop) * 100)), 100)
+        image.save(os.path.join(photo_dir, f'IMG_{i:07d}.jpg'), exif=exif)
+
+def time_stage(result_list, seed, scale, stage, n_points, func, repeat, **params):
+
+    #best of repeat runs. the stages' own progress prints are swallowed so they don't skew the timings
+    run_times = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            value = func()
+            run_times.append(time.perf_counter() - start)
+
+    result_list.append({'seed': seed, 'scale': scale, 'stage': stage, 'points': int(n_points),
+                        'seconds': min(run_times), 'mean_seconds': sum(run_times) / len(run_times), **params})
+    print(f'{seed} x{scale} {stage}: {n_points} points, {round(min(run_times),4)}s')
+    return value
+
+def get_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmark(pair_list, scale_list, repeat=3, photo_scale_list=None, workers_list=(1,)):
+
+    result_list = []
+    pe = PointExtractor.PointExtractor()
+    if photo_scale_list is None:
+        photo_scale_list = scale_list
+
+    for src_file, ref_file in pair_list:
+        seed = os.path.basename(src_file).replace('-local.gpx', '')
+        with contextlib.redirect_stdout(io.StringIO()):
+            seed_src_track = pe.get_points_gpx(src_file, cache=False)
+            seed_ref_track = pe.get_points_gpx(ref_file, cache=False)
+
+        for scale in scale_list:
+            src_track, ref_track = scale_pair(seed_src_track, seed_ref_track, scale)
+
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                ref_gpx = os.path.join(tmp_dir, 'ref.gpx')
+
+                def write_gpx():
+                    gpxw = GPXWriter.GPXWriter(ref_gpx)
+                    gpxw.add_track(ref_track)
+                    gpxw.finalize()
+                time_stage(result_list, seed, scale, 'write_gpx', len(ref_track), write_gpx, repeat)
+
+                time_stage(result_list, seed, scale, 'parse_gpx', len(ref_track),
+                           lambda: pe.get_points_gpx(ref_gpx, cache=False), repeat)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    pe.get_points_gpx(ref_gpx)
+                time_stage(result_list, seed, scale, 'load_cached_gpx', len(ref_track),
+                           lambda: pe.get_points_gpx(ref_gpx), repeat)
+
+                if scale in photo_scale_list:
+                    photo_dir = os.path.join(tmp_dir, 'photos')
+                    os.mkdir(photo_dir)
+                    make_photos(src_track, photo_dir)
+                    for workers in workers_list:
+                        time_stage(result_list, seed, scale, 'exif_extract', len(src_track),
+                                   lambda: pe.get_points_local(photo_dir, 0, workers), repeat, workers=workers)
+
+            offset = time_stage(result_list, seed, scale, 'calibrate', len(src_track) + len(ref_track),
+                                lambda: RouteAnalyzer.calibrate_src(src_track, ref_track), repeat)
+
+            #dense per second lookups over the ref track, what the 1 second resampling used to build
+            query_time = np.arange(ref_track.time[0], ref_track.time[-1] + 1)
+            time_stage(result_list, seed, scale, 'interpolate', len(query_time),
+                       lambda: Interpolator.Interpolator(ref_track).lat_lon(query_time), repeat)
+
+            def build_features():
+                merged_df = RouteAnalyzer.get_merged_df(src_track, ref_track, offset)
+                merged_df['pt_density_src'] = len(src_track) / (src_track.time[-1] - src_track.time[0])
+                reg = Regression.Regression(merged_df[FEATURE_LIST], RouteAnalyzer.get_err_df(merged_df)['l1_err'])
+                return reg.fit(FEATURE_LIST)
+            time_stage(result_list, seed, scale, 'features', len(src_track) + len(ref_track), build_features, repeat)
+
+    return result_list
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--manifest',     default=os.path.join(SEED_DIR, 'manifest.csv'), help='csv of src,ref seed gpx pairs')
+    parser.add_argument('--scales',       type=int, nargs='+', default=[1, 10, 100], help='copies of each seed pair, one per day')
+    parser.add_argument('--photo_scales', type=int, nargs='+', default=None, help='scales to generate jpegs for, all by default')
+    parser.add_argument('--workers',      type=int, nargs='+', default=[1], help='worker counts to time exif extraction with')
+    parser.add_argument('--repeat',       type=int, default=3, help='runs per stage, the fastest is reported')
+    parser.add_argument('--out',          default='benchmark-results.json', help='json file the timings are written to')
+    args = parser.parse_args()
+
+    result_list = run_benchmark(RouteAnalyzer.read_manifest(args.manifest), args.scales, args.repeat,
+                                args.photo_scales, args.workers)
+
+    with open(args.out, 'w') as f:
+        json.dump({'commit': get_commit(),
+                   'created': dt.datetime.now().isoformat(timespec='seconds'),
+                   'python': sys.version.split()[0],
+                   'numpy': np.__version__,
+                   'platform': platform.platform(),
+                   'args': vars(args),
+                   'results': result_list}, f, indent=2)
+    print('Benchmark results saved:', args.out)
@@ -0,0 +1,152 @@
+#std packages
+import argparse
+
+#local packages
+import Metrics
+
+#single entry point for the TrailDetective tools, e.g.
+#   python traildetective.py write local clark_20200427 --utc_zone -4
+#   python traildetective.py analyze manifest.csv --calibrate
+#each subcommand imports its modules when it runs, so e.g. a local gpx export never loads pandas or the google client.
+#stage timings and counters are collected quietly, --metrics saves them as json at the end, e.g.
+#   python traildetective.py --metrics run.json write local clark_20200427
+#watch keeps a local folder's GPX file up to date as photos arrive, until interrupted with ctrl-c
+
+LOCAL  = 'local'
+GCLOUD = 'gcloud'
+THREAD  = 'thread'
+PROCESS = 'process'
+
+def add_extract_args(parser):
+    parser.add_argument('dir_type',      choices={LOCAL, GCLOUD}, help='type of storage directory: local or gcloud')
+    parser.add_argument('input_dir',     nargs='+',               help='input directory name(s)')
+    parser.add_argument('--utc_zone',    type=int, default=0,     help="UTC timezone as an int offset from GMT, e.g. 3 or -4")
+    parser.add_argument('--workers',     type=int, default=1,     help='number of parallel workers for reading local photos')
+    parser.add_argument('--pool',        choices={THREAD, PROCESS}, default=THREAD, help='worker pool type for reading local photos')
+    parser.add_argument('--no_cache',    dest='use_cache', action='store_false', help='re-read every photo instead of using the local photo cache or drive mirror')
+    parser.add_argument('--clear_cache', action='store_true', help='invalidate the photo cache or drive mirror before extracting')
+
+def add_calibration_args(parser):
+    parser.add_argument('--max_window',  type=int, default=None, help='only search calibration offsets within +/- this many seconds')
+    parser.add_argument('--resolution',  type=float, default=1,  help='calibration step in seconds, may be below 1')
+
+def add_write_args(parser):
+    parser.add_argument('--gzip',     dest='compress', action='store_true', help='write a gzip compressed .gpx.gz file')
+    parser.add_argument('--simplify', type=float, default=None, metavar='TOLERANCE',
+                                      help='drop points within this many metres of the simplified track (Douglas-Peucker)')
+
+def run_extract(args):
+
+    import GPXWriter
+
+    session = None
+    if args.dir_type == GCLOUD:
+        import DriveClient
+        session = DriveClient.DriveSession()
+        session.resolve_folders(args.input_dir)
+
+    for input_dir in args.input_dir:
+        track = GPXWriter.extract_track(args.dir_type, input_dir, args.utc_zone, args.workers, args.pool,
+                                        args.use_cache, args.clear_cache, session)
+        if len(track):
+            datetimes = track.datetimes()
+            print(f'<{input_dir}>: {len(track)} points from {datetimes[0]} to {datetimes[-1]}')
+        else:
+            print(f'<{input_dir}>: 0 points')
+        if args.save is not None:
+            path = args.save if len(args.input_dir) == 1 else f'{args.save}-{input_dir}'
+            track.save(path)
+            print('Track columns saved:', path)
+
+def run_write(args):
+
+    import GPXWriter
+
+    GPXWriter.make_gpx_batch(args.dir_type, args.input_dir, args.utc_zone, args.workers, args.pool,
+                             args.use_cache, args.clear_cache, args.compress, args.simplify)
+
+def run_watch(args):
+
+    import FolderWatcher
+
+    with FolderWatcher.FolderWatcher(args.input_dir, args.utc_zone, args.interval, args.debounce, args.workers,
+                                     args.pool, args.use_cache, args.compress, args.simplify, args.append) as watcher:
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            print('Stopped watching:', args.input_dir)
+
+def run_calibrate(args):
+
+    import PointExtractor
+    import RouteAnalyzer
+
+    pe = PointExtractor.PointExtractor()
+    src_track = pe.get_points_gpx(args.src_file)
+    ref_track = pe.get_points_gpx(args.ref_file)
+    if len(src_track) == 0 or len(ref_track) == 0:
+        raise Exception('Both gpx files need at least 1 point to calibrate')
+    RouteAnalyzer.calibrate_src(src_track, ref_track, args.max_window, args.coarse_step, args.resolution,
+                                f'{args.src_file} vs {args.ref_file}')
+
+def run_analyze(args):
+
+    import RouteAnalyzer
+
+    RouteAnalyzer.analyze(args.manifest_file, args.workers, args.do_calibration, args.max_window, args.resolution,
+                          args.max_gap)
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(prog='traildetective')
+    parser.add_argument('--metrics', default=None, metavar='PATH', help="save stage timings and counters as json to PATH, '-' prints them")
+    parser.add_argument('--verbose', action='store_true', help='print a warning for every skipped photo instead of only counting them')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    extract_parser = subparsers.add_parser('extract', help='extract the photo track of one or more folders and summarize it')
+    add_extract_args(extract_parser)
+    extract_parser.add_argument('--save', default=None, help='also save the track columns to this folder, see Track.save')
+    extract_parser.set_defaults(func=run_extract)
+
+    write_parser = subparsers.add_parser('write', help='write one GPX file per photo folder')
+    add_extract_args(write_parser)
+    add_write_args(write_parser)
+    write_parser.set_defaults(func=run_write)
+
+    watch_parser = subparsers.add_parser('watch', help="poll a local photo folder and update its GPX file as new photos arrive")
+    watch_parser.add_argument('input_dir',    help='local photo directory')
+    watch_parser.add_argument('--utc_zone',   type=int, default=0,  help="UTC timezone as an int offset from GMT, e.g. 3 or -4")
+    watch_parser.add_argument('--workers',    type=int, default=1,  help='number of parallel workers for reading local photos')
+    watch_parser.add_argument('--pool',       choices={THREAD, PROCESS}, default=THREAD, help='worker pool type for reading local photos')
+    watch_parser.add_argument('--no_cache',   dest='use_cache', action='store_false', help='re-read every photo instead of using the local photo cache')
+    watch_parser.add_argument('--interval',   type=float, default=5,  help='seconds between two listings of the folder')
+    watch_parser.add_argument('--debounce',   type=float, default=10, help='seconds the folder must stay unchanged before the GPX file is updated')
+    watch_parser.add_argument('--append',     action='store_true', help='add new photos to the GPX file in place instead of rewriting it')
+    add_write_args(watch_parser)
+    watch_parser.set_defaults(func=run_watch)
+
+    calibrate_parser = subparsers.add_parser('calibrate', help='find the clock offset of a src gpx file against a ref gpx file')
+    calibrate_parser.add_argument('src_file', help='gpx file whose clock is calibrated, e.g. a photo track')
+    calibrate_parser.add_argument('ref_file', help='reference gpx file, e.g. a watch track')
+    calibrate_parser.add_argument('--coarse_step', type=int, default=None, help='offset step in seconds of the first search pass')
+    add_calibration_args(calibrate_parser)
+    calibrate_parser.set_defaults(func=run_calibrate)
+
+    analyze_parser = subparsers.add_parser('analyze', help='run the error regressions over the hike pairs of a manifest')
+    analyze_parser.add_argument('manifest_file', help='csv of src,ref gpx pairs')
+    analyze_parser.add_argument('--workers',   type=int, default=None, help='worker processes, 1 analyzes the pairs serially')
+    analyze_parser.add_argument('--calibrate', dest='do_calibration', action='store_true', help='calibrate each src before analysis')
+    analyze_parser.add_argument('--max_gap',   type=int, default=None, help='also split tracks at time gaps over this many seconds, e.g. 14400')
+    add_calibration_args(analyze_parser)
+    analyze_parser.set_defaults(func=run_analyze)
+
+    args = parser.parse_args(argv)
+    Metrics.verbose = args.verbose
+    with Metrics.timer('command.' + args.command):
+        args.func(args)
+
+    if args.metrics is not None:
+        Metrics.save(args.metrics)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+#std packages
+import datetime as dt
+import os
+import sys
+
+#installed packages
+import pytest
+
+#the modules in src import each other as top level modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+#local packages
+import Metrics
+
+def to_dms(deg):
+
+    #exif gps coordinates are (degrees, minutes, seconds) rationals
+    from PIL.TiffImagePlugin import IFDRational
+
+    deg = abs(deg)
+    minutes = (deg - int(deg)) * 60
+    seconds = (minutes - int(minutes)) * 60
+    return (IFDRational(int(deg)), IFDRational(int(minutes)), IFDRational(int(round(seconds * 10000)), 10000))
+
+@pytest.fixture
+def make_photo(tmp_path):
+
+    #writes a small photo with the epoch time (as utc local time), position, ele and DOP in its exif.
+    #the format follows the file extension, e.g. png photos can only be read through PIL
+    import PIL.Image
+    from PIL.TiffImagePlugin import IFDRational
+
+    def make(name, time, lat, lon, ele=None, dop=None, dir=None):
+        exif = PIL.Image.Exif()
+        exif.get_ifd(0x8769)[36867] = dt.datetime.fromtimestamp(time, dt.timezone.utc).strftime('%Y:%m:%d %H:%M:%S')
+        gps = exif.get_ifd(0x8825)
+        gps[1] = 'N' if lat >= 0 else 'S'
+        gps[2] = to_dms(lat)
+        gps[3] = 'E' if lon >= 0 else 'W'
+        gps[4] = to_dms(lon)
+        if ele is not None:
+            gps[5] = b'\x00' if ele >= 0 else b'\x01'
+            gps[6] = IFDRational(int(round(abs(ele) * 100)), 100)
+        if dop is not None:
+            gps[11] = IFDRational(int(round(dop * 100)), 100)
+
+        path = os.path.join(str(tmp_path) if dir is None else dir, name)
+        #as bytes, since png only embeds exif passed that way
+        PIL.Image.new('RGB', (16, 16)).save(path, exif=exif.tobytes())
+        return path
+
+    return make
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+
+    #counters are module state, so every test starts from zero
+    Metrics.reset()
+    Metrics.verbose = False
+    yield
@@ -0,0 +1,57 @@
+#std packages
+import os
+import sqlite3
+
+#local packages
+import DriveSync
+import FakeDrive
+import Metrics
+
+def test_sync_counts_and_mirror_path(tmp_path, monkeypatch):
+
+    #the folder name doubles as the local path the mirror is written next to
+    monkeypatch.chdir(tmp_path)
+    service = FakeDrive.FakeDriveService()
+    folder_id = FakeDrive.make_photo_folder(service, 'trip', 10)
+
+    with DriveSync.DriveSync('trip') as sync:
+        assert sync.path == 'trip' + DriveSync.MIRROR_SUFFIX
+        photo_list = sync.update(service)
+        assert [photo['name'] for photo in photo_list] == [f'IMG_{i:06d}.jpg' for i in range(10)]
+        service.add_file(folder_id, 'IMG_NEW.jpg', {'time': '2020:04:28 08:00:00'})
+        service.trash_file(photo_list[0]['id'])
+        assert len(sync.update(service)) == 10
+    assert os.path.exists(os.path.join(str(tmp_path), 'trip' + DriveSync.MIRROR_SUFFIX))
+
+    assert Metrics.counters['drive_full_syncs'] == 1
+    assert Metrics.counters['drive_incremental_syncs'] == 1
+    assert Metrics.counters['drive_sync_files_updated'] == 11
+    assert Metrics.counters['drive_sync_files_removed'] == 1
+
+def test_mirror_of_another_schema_is_fully_synced_again(tmp_path):
+
+    service = FakeDrive.FakeDriveService()
+    FakeDrive.make_photo_folder(service, 'trip', 5)
+    path = str(tmp_path / 'sync.sqlite')
+    with DriveSync.DriveSync('trip', path=path) as sync:
+        sync.update(service)
+
+    conn = sqlite3.connect(path)
+    conn.execute(f'PRAGMA user_version = {DriveSync.SCHEMA_VERSION + 1}')
+    conn.close()
+
+    with DriveSync.DriveSync('trip', path=path) as sync:
+        assert len(sync.update(service)) == 5
+    assert Metrics.counters['drive_full_syncs'] == 2
+
+def test_other_folder_id_rebuilds_the_mirror(tmp_path):
+
+    service = FakeDrive.FakeDriveService()
+    FakeDrive.make_photo_folder(service, 'trip', 5)
+    other_id = FakeDrive.make_photo_folder(service, 'trip', 3)
+
+    with DriveSync.DriveSync('trip', path=str(tmp_path / 'sync.sqlite')) as sync:
+        #both folders are named trip, so the id picks one
+        assert len(sync.update(service, other_id)) == 3
+        assert len(sync.update(service, other_id)) == 3
+    assert Metrics.counters['drive_full_syncs'] == 1
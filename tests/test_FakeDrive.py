@@ -0,0 +1,113 @@
+#installed packages
+import pytest
+
+#local packages
+import DriveClient
+import DriveSync
+import FakeDrive
+import Metrics
+import PointExtractor
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(DriveClient, 'BACKOFF_BASE', 0.001)
+
+def get_points(service, dir='trip', sync=None):
+    return PointExtractor.PointExtractor().get_points_gcloud(dir, 0, service=service, sync=sync)
+
+def make_service(**kwargs):
+    service = FakeDrive.FakeDriveService(**kwargs)
+    FakeDrive.make_photo_folder(service, 'trip', 20, skip_every=0)
+    return service
+
+def test_full_listing_pages_through_the_folder():
+
+    service = FakeDrive.FakeDriveService()
+    FakeDrive.make_photo_folder(service, 'trip', 2500)
+    #photos in other folders aren't listed
+    FakeDrive.make_photo_folder(service, 'other', 5)
+
+    track = get_points(service)
+    #every 10th photo has no location
+    assert len(track) == 2250
+    assert Metrics.counters['drive_files_listed'] == 2500
+    #one folder lookup, then three full size pages
+    assert service.request_ctr == 4
+    assert service.max_page_size == DriveClient.PAGE_SIZE
+
+def test_quoted_folder_name_is_found():
+
+    service = FakeDrive.FakeDriveService()
+    FakeDrive.make_photo_folder(service, "o'brien \\ trip", 5)
+    assert len(get_points(service, "o'brien \\ trip")) == 5
+
+def test_retryable_errors_are_retried():
+
+    expected = get_points(make_service())
+    service = make_service(error_every=2)
+    track = get_points(service)
+    assert service.error_ctr > 0
+    assert Metrics.counters['drive_retries'] == service.error_ctr
+    assert track.time.tolist() == expected.time.tolist()
+
+def test_rate_limit_403_is_retried_but_other_403s_are_not():
+
+    service = make_service(error_every=2, error_status=403, error_content=b'{"reason": "userRateLimitExceeded"}')
+    assert len(get_points(service)) == 20
+
+    service = make_service(error_every=2, error_status=403, error_content=b'{"reason": "insufficientPermissions"}')
+    with pytest.raises(FakeDrive.FakeHttpError):
+        get_points(service)
+
+def test_retries_give_up_after_max_retries():
+
+    service = make_service(error_every=1, error_status=503)
+    with pytest.raises(FakeDrive.FakeHttpError):
+        get_points(service)
+    assert service.request_ctr == DriveClient.MAX_RETRIES + 1
+
+def test_incremental_sync_matches_a_full_listing(tmp_path):
+
+    service = FakeDrive.FakeDriveService()
+    folder_id = FakeDrive.make_photo_folder(service, 'trip', 20, skip_every=0)
+    other_id = service.add_folder('other')
+
+    with DriveSync.DriveSync('trip', path=str(tmp_path / 'sync.sqlite')) as sync:
+        assert get_points(service, sync=sync).time.tolist() == get_points(service).time.tolist()
+        file_ids = [file_id for file_id, item in service.items.items() if folder_id in item['parents']]
+
+        #adds, a metadata change, a trash, a delete and a move out of the folder
+        service.add_file(folder_id, 'IMG_NEW.jpg', {'time': '2020:04:28 08:00:00',
+                                                    'location': {'latitude': 36.0, 'longitude': -115.0, 'altitude': 900.0}})
+        service.update_file(file_ids[0], imageMediaMetadata={'time': '2020:04:26 08:00:00',
+                                                             'location': {'latitude': 36.1, 'longitude': -115.1,
+                                                                          'altitude': 900.0}})
+        service.trash_file(file_ids[1])
+        service.delete_file(file_ids[2])
+        service.update_file(file_ids[3], parents=[other_id])
+
+        request_ctr = service.request_ctr
+        track = get_points(service, sync=sync)
+        #a single changes page, no folder lookup or listing
+        assert service.request_ctr - request_ctr == 1
+        assert Metrics.counters['drive_change_pages_fetched'] == 1
+
+    expected = get_points(service)
+    assert len(track) == 18
+    assert track.time.tolist() == expected.time.tolist()
+    assert track.lat.tolist() == expected.lat.tolist()
+
+def test_sync_state_survives_reopening(tmp_path):
+
+    service = FakeDrive.FakeDriveService()
+    folder_id = FakeDrive.make_photo_folder(service, 'trip', 10, skip_every=0)
+    path = str(tmp_path / 'sync.sqlite')
+    with DriveSync.DriveSync('trip', path=path) as sync:
+        get_points(service, sync=sync)
+
+    service.add_file(folder_id, 'IMG_NEW.jpg', {'time': '2020:04:28 08:00:00',
+                                                'location': {'latitude': 36.0, 'longitude': -115.0, 'altitude': 900.0}})
+    request_ctr = service.request_ctr
+    with DriveSync.DriveSync('trip', path=path) as sync:
+        assert len(get_points(service, sync=sync)) == 11
+    assert service.request_ctr - request_ctr == 1
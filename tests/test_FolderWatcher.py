@@ -0,0 +1,36 @@
+#std packages
+import os
+
+#local packages
+import FolderWatcher
+import Metrics
+import PointExtractor
+
+def test_unreadable_photo_is_retried(tmp_path, make_photo):
+
+    input_dir = str(tmp_path / 'photos')
+    os.mkdir(input_dir)
+    for i in range(3):
+        make_photo(f'IMG_{i}.jpg', 1565532554 + 60 * i, 36.1 + 0.001 * i, -115.0833, dir=input_dir)
+    #e.g. a photo that's still being copied into the folder
+    bad_photo = os.path.join(input_dir, 'IMG_3.jpg')
+    with open(bad_photo, 'wb') as f:
+        f.write(b'\xff\xd8\xff' + b'\x00' * 10)
+
+    with FolderWatcher.FolderWatcher(input_dir, debounce=0) as watcher:
+        assert watcher.poll()
+        assert len(watcher.track) == 3
+        assert bad_photo not in watcher.snapshot and len(watcher.snapshot) == 3
+        assert Metrics.counters['watch_photos_failed'] == 1
+        assert watcher.skipped_ctr == 0
+        gpx_track = PointExtractor.PointExtractor().get_points_gpx(watcher.name, cache=False)
+        assert gpx_track.time.tolist() == watcher.track.time.tolist()
+
+        #once the copy completes, the next poll picks the photo up
+        os.remove(bad_photo)
+        make_photo('IMG_3.jpg', 1565532554 + 180, 36.104, -115.0833, dir=input_dir)
+        assert watcher.poll()
+        assert len(watcher.track) == 4
+        assert bad_photo in watcher.snapshot
+        assert Metrics.counters['watch_photos_failed'] == 1
+        assert Metrics.counters.get('watch_rebuilds', 0) == 0
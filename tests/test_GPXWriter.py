@@ -0,0 +1,102 @@
+#std packages
+import gzip
+import os
+
+#installed packages
+import numpy as np
+import pytest
+
+#local packages
+import GPXWriter
+import Metrics
+import PointExtractor
+from Track import Track
+
+def make_track(time, segment):
+    n = len(time)
+    return Track(np.array(time, dtype=np.int64), 36.0 + 1e-4 * np.arange(n), np.full(n, -115.0),
+                 np.full(n, 1000.0, dtype=np.float32), np.full(n, np.nan, dtype=np.float32), segment=np.array(segment))
+
+def read_text(name):
+    opener = gzip.open if name.endswith('.gz') else open
+    with opener(name, 'rt') as f:
+        return f.read()
+
+def read_segments(name):
+
+    #the times of the file's points, one list per trkseg
+    track = PointExtractor.PointExtractor().get_points_gpx(name, cache=False)
+    return [segment.time.tolist() for segment in track.split_segments()]
+
+def append_both(tmp_path, file_track, new_track):
+
+    #appends to a plain and a gzip copy of the same file, which can only be merged, and checks they agree
+    name_list = [os.path.join(str(tmp_path), 'trip-local.gpx' + ext) for ext in ('', '.gz')]
+    for name in name_list:
+        GPXWriter.write_gpx(name, file_track)
+        GPXWriter.append_gpx(name, new_track)
+    assert read_text(name_list[0]) == read_text(name_list[1])
+    return name_list[0]
+
+def test_in_place_append_matches_merge(tmp_path):
+
+    file_track = make_track([0, 10, 100, 110], [0, 0, 1, 1])
+    new_track = make_track([200, 210, 300], [5, 5, 6])
+    name = append_both(tmp_path, file_track, new_track)
+
+    #only the gzip copy was rewritten. the new points continue the last trkseg, but keep their own break
+    assert Metrics.counters['gpx_merge_rewrites'] == 1
+    assert read_segments(name) == [[0, 10], [100, 110, 200, 210], [300]]
+
+def test_out_of_order_merge(tmp_path):
+
+    file_track = make_track([0, 10, 20, 100, 110], [0, 0, 0, 1, 1])
+    new_track = make_track([5, 15, 105, 200], [0, 0, 1, 1])
+    name = append_both(tmp_path, file_track, new_track)
+
+    assert Metrics.counters['gpx_merge_rewrites'] == 2
+    assert read_segments(name) == [[0, 5, 10, 15, 20], [100], [105, 110, 200]]
+    assert not [tmp_name for tmp_name in os.listdir(str(tmp_path)) if tmp_name.endswith('.tmp')]
+
+def test_merge_streams_in_chunks(tmp_path, monkeypatch):
+
+    #a chunk boundary between the file's points doesn't change the result
+    file_track = make_track(np.arange(0, 100, 10), np.zeros(10, dtype=int))
+    new_track = make_track(np.arange(5, 100, 10), np.zeros(10, dtype=int))
+    name = os.path.join(str(tmp_path), 'trip-local.gpx')
+    GPXWriter.write_gpx(name, file_track)
+    monkeypatch.setattr(GPXWriter, 'CHUNK_SIZE', 3)
+    GPXWriter.merge_gpx(name, new_track)
+    assert read_segments(name) == [list(range(0, 100, 5))]
+
+@pytest.mark.parametrize('new_time', [[200], [5]])
+def test_foreign_gpx_is_refused(tmp_path, new_time):
+
+    name = os.path.join(str(tmp_path), 'other.gpx')
+    GPXWriter.write_gpx(name, make_track([0, 10], [0, 0]))
+    with open(name) as f:
+        text = f.read().replace('<trk>', '<metadata><name>other</name></metadata>\n  <trk>')
+    with open(name, 'w') as f:
+        f.write(text)
+
+    with pytest.raises(Exception, match='not written by GPXWriter'):
+        GPXWriter.append_gpx(name, make_track(new_time, [0]))
+    assert read_text(name) == text
+
+def test_failed_append_leaves_the_file_intact(tmp_path, monkeypatch):
+
+    name = os.path.join(str(tmp_path), 'trip-local.gpx')
+    GPXWriter.write_gpx(name, make_track([0, 10], [0, 0]))
+    text = read_text(name)
+
+    #e.g. a full disk while the new tail is written past the end of the file
+    def fail(fd):
+        raise OSError('no space left on device')
+    monkeypatch.setattr(GPXWriter.os, 'fsync', fail)
+    with pytest.raises(OSError):
+        GPXWriter.append_gpx(name, make_track([20, 30], [0, 0]))
+    assert read_text(name) == text
+
+    monkeypatch.undo()
+    GPXWriter.append_gpx(name, make_track([20, 30], [0, 0]))
+    assert read_segments(name) == [[0, 10, 20, 30]]
@@ -0,0 +1,41 @@
+#installed packages
+import numpy as np
+
+#local packages
+import Interpolator
+from Track import Track
+
+def make_track():
+
+    #two segments with a night between them, and a second point sharing the first segment's last second
+    return Track([0, 10, 20, 20, 1000, 1010], [0.0, 1.0, 2.0, 9.0, 3.0, 4.0], [0.0] * 6,
+                 [100, np.nan, 120, 0, 130, 140], [1, 2, 3, 4, 5, 6], segment=[0, 0, 0, 0, 1, 1])
+
+def test_nothing_is_interpolated_between_segments():
+
+    interp = Interpolator.Interpolator(make_track())
+    times = np.array([-1, 0, 5, 15, 20, 21, 500, 999, 1000, 1005, 1010, 1011])
+    lat, lon = interp.lat_lon(times)
+
+    expected_lat = [np.nan, 0.0, 0.5, 1.5, 2.0, np.nan, np.nan, np.nan, 3.0, 3.5, 4.0, np.nan]
+    assert np.allclose(lat, expected_lat, equal_nan=True)
+    assert np.array_equal(np.isnan(lon), np.isnan(lat))
+    assert interp.nearest(times).tolist() == [-1, 0, 0, 1, 2, -1, -1, -1, 4, 4, 5, -1]
+
+def test_columns_follow_the_segment_mask():
+
+    #the missing ele at 10 is bridged, but not the gap between the segments
+    interp = Interpolator.Interpolator(make_track())
+    times = np.array([5, 10, 500, 1005])
+    assert np.allclose(interp.col('ele', times), [105, 110, np.nan, 135], equal_nan=True)
+    assert np.allclose(interp.col('DOP', times), [1.5, 2, np.nan, 5.5], equal_nan=True)
+
+def test_geodesic_matches_linear_along_a_meridian():
+
+    #great circles along a meridian are straight in lat/lon, only the masking could differ
+    track = make_track()
+    times = np.arange(0, 1011, 0.5)
+    linear_lat, linear_lon = Interpolator.Interpolator(track).lat_lon(times)
+    geodesic_lat, geodesic_lon = Interpolator.Interpolator(track, Interpolator.GEODESIC).lat_lon(times)
+    assert np.array_equal(np.isnan(geodesic_lat), np.isnan(linear_lat))
+    assert np.allclose(geodesic_lat, linear_lat, atol=1e-3, equal_nan=True)
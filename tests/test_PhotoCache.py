@@ -0,0 +1,36 @@
+#std packages
+import os
+
+#local packages
+import Metrics
+import PhotoCache
+
+def test_exif_round_trip(tmp_path):
+
+    #cached tags come back in the shape the exif readers return them: int tags, tuples and bytes
+    exif_data = {36867: '2019:08:11 14:09:14',
+                 34853: {1: 'N', 2: ((36, 1), (6, 1), (0, 1)), 5: b'\x00', 6: (2001, 2)}}
+    photo = os.path.join(str(tmp_path), 'IMG_0000000.jpg')
+    with open(photo, 'wb') as f:
+        f.write(b'jpeg')
+    stat = os.stat(photo)
+
+    with PhotoCache.PhotoCache(str(tmp_path)) as cache:
+        cache.store([photo, photo + '.none'], [stat, stat], [exif_data, None])
+    with PhotoCache.PhotoCache(str(tmp_path)) as cache:
+        assert cache.lookup([photo, photo + '.none'], [stat, stat]) == [exif_data, None]
+
+def test_unstorable_exif_is_skipped(tmp_path):
+
+    #a value json can't hold only keeps its own photo out of the cache
+    photo_list = [os.path.join(str(tmp_path), f'IMG_000000{i}.jpg') for i in range(2)]
+    for photo in photo_list:
+        with open(photo, 'wb') as f:
+            f.write(b'jpeg')
+    stat_list = [os.stat(photo) for photo in photo_list]
+    exif_list = [{36867: '2019:08:11 14:09:14', 37500: object()}, {36867: '2019:08:11 14:09:15'}]
+
+    with PhotoCache.PhotoCache(str(tmp_path)) as cache:
+        cache.store(photo_list, stat_list, exif_list)
+        assert cache.lookup(photo_list, stat_list) == [PhotoCache.MISS, exif_list[1]]
+    assert Metrics.counters['photo_cache_unstorable'] == 1
@@ -0,0 +1,23 @@
+#installed packages
+import numpy as np
+
+#local packages
+import PointExtractor
+
+def test_pil_fallback_matches_fast_reader(make_photo):
+
+    photo = make_photo('IMG_0000000.jpg', 1565532554, 36.1, -115.0833, 1000.5, 2.5)
+    fast_exif = PointExtractor.PointExtractor().read_exif(photo)
+    pil_exif = PointExtractor.PointExtractor(fast_exif=False).read_exif(photo)
+    assert pil_exif == fast_exif
+
+def test_png_photo_is_extracted(make_photo):
+
+    #png has no header-only reader, so its exif is always read through PIL
+    photo = make_photo('IMG_0000000.png', 1565532554, 36.1, -115.0833, 1000.5, 2.5)
+    track, skipped_ctr = PointExtractor.PointExtractor().get_points_photos([photo], 0)
+
+    assert skipped_ctr == 0
+    assert track.time.tolist() == [1565532554]
+    assert np.allclose(track.lat, [36.1]) and np.allclose(track.lon, [-115.0833])
+    assert np.allclose(track.ele, [1000.5]) and np.allclose(track.dop, [2.5])
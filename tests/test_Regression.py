@@ -0,0 +1,50 @@
+#installed packages
+import numpy as np
+import pandas as pd
+import pytest
+
+#local packages
+import Regression
+
+@pytest.fixture
+def nan_df():
+
+    #each feature and the target are missing on different rows
+    rng = np.random.default_rng(0)
+    n = 400
+    X_df = pd.DataFrame({'a': rng.normal(size=n), 'b': rng.normal(size=n) + 1000, 'c': rng.normal(size=n)})
+    y = 2 * X_df['a'] - 0.5 * X_df['b'] + X_df['c'] + rng.normal(size=n)
+    X_df.loc[rng.choice(n, 40, replace=False), 'a'] = np.nan
+    X_df.loc[rng.choice(n, 60, replace=False), 'c'] = np.nan
+    y[rng.choice(n, 20, replace=False)] = np.nan
+    return X_df, y
+
+@pytest.mark.parametrize('feature_list', [['a'], ['b'], ['c'], ['a', 'b'], ['b', 'c'], ['a', 'c'], ['a', 'b', 'c']])
+def test_matches_statsmodels_with_missing_values(nan_df, feature_list):
+
+    import statsmodels.api as sm
+    from statsmodels.stats.outliers_influence import variance_inflation_factor
+
+    X_df, y = nan_df
+    fit = Regression.Regression(X_df, y).fit(feature_list)
+
+    sm_fit = sm.OLS(y, sm.add_constant(X_df[feature_list]), missing='drop').fit()
+    assert fit.rsquared == pytest.approx(sm_fit.rsquared)
+    assert fit.rsquared_adj == pytest.approx(sm_fit.rsquared_adj)
+    for feature in feature_list:
+        assert fit.params[feature] == pytest.approx(sm_fit.params[feature])
+    assert fit.params[Regression.INTERCEPT] == pytest.approx(sm_fit.params['const'])
+
+    if len(feature_list) > 1:
+        exog = sm_fit.model.exog
+        for i, feature in enumerate(feature_list):
+            assert fit.vif[feature] == pytest.approx(variance_inflation_factor(exog, i + 1))
+
+def test_gram_matrices_are_shared(nan_df):
+
+    #b is complete, so fits on it alone reuse the gram matrix of every row with a target
+    X_df, y = nan_df
+    reg = Regression.Regression(X_df, y)
+    for feature_list in (['b'], ['a'], ['a', 'b'], ['c', 'a'], ['a', 'c', 'b']):
+        reg.fit(feature_list)
+    assert len(reg.stats) == 3
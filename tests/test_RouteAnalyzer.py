@@ -0,0 +1,56 @@
+#std packages
+import os
+
+#installed packages
+import numpy as np
+import pytest
+
+#local packages
+import GPXWriter
+import RouteAnalyzer
+from Track import Track
+
+def make_line_track(start, n=120):
+
+    #one point a second, heading north
+    time = np.arange(start, start + n, dtype=np.int64)
+    return Track(time, 36.0 + 0.0001 * np.arange(n), np.full(n, -115.0))
+
+def test_calibration_without_overlap_names_the_pair():
+
+    src_track = make_line_track(0)
+    ref_track = make_line_track(10000)
+    with pytest.raises(Exception, match=r'\[0, 60\].*src\.gpx vs ref\.gpx'):
+        RouteAnalyzer.calibrate_src(src_track, ref_track, max_window=60, name='src.gpx vs ref.gpx')
+
+def test_calibration_from_an_offset_without_overlap(capsys):
+
+    #the uncalibrated tracks don't overlap, so there's no error to reduce from
+    src_track = make_line_track(0)
+    ref_track = make_line_track(1000, 300)
+    assert RouteAnalyzer.calibrate_src(src_track, ref_track) == 1000
+    output = capsys.readouterr().out
+    assert 'nan' not in output and 'does not overlap' in output
+
+def write_gap_gpx(tmp_path, name, lat_shift):
+
+    #ten minutes, a six hour break and ten more minutes, all in one trkseg
+    time = np.r_[np.arange(0, 600, 5), np.arange(22200, 22800, 5)].astype(np.int64)
+    n = len(time)
+    track = Track(time, 36.0 + 1e-5 * np.arange(n) + lat_shift, np.full(n, -115.0),
+                  np.full(n, 1000.0, dtype=np.float32), np.full(n, 2.0, dtype=np.float32))
+    name = os.path.join(str(tmp_path), name)
+    GPXWriter.write_gpx(name, track)
+    return name
+
+def test_long_gap_in_one_segment_is_only_split_with_max_gap(tmp_path):
+
+    src_file = write_gap_gpx(tmp_path, 'src.gpx', 1e-5)
+    ref_file = write_gap_gpx(tmp_path, 'ref.gpx', 0)
+
+    #by default the gap is interpolated across, one row per second of the whole overlap
+    merged_df = RouteAnalyzer.process_pair(src_file, ref_file)
+    assert len(merged_df) == 22796
+    #split, only the seconds within the two stretches of points are compared
+    merged_df = RouteAnalyzer.process_pair(src_file, ref_file, max_gap=4 * 60 * 60)
+    assert len(merged_df) == 2 * 596
@@ -0,0 +1,42 @@
+#installed packages
+import numpy as np
+import pytest
+
+#local packages
+import Simplifier
+
+def reference_douglas_peucker(x, y, tolerance, start, end, keep):
+
+    #textbook recursion, returns the max distance of a dropped point. ties go to the first point
+    if end - start < 2:
+        return 0.0
+    dist = Simplifier.segment_dist(x[start + 1:end], y[start + 1:end], x[start], y[start], x[end], y[end])
+    split_pt = start + 1 + int(np.argmax(dist))
+    if dist.max() <= tolerance:
+        return float(dist.max())
+    keep[split_pt] = True
+    return max(reference_douglas_peucker(x, y, tolerance, start, split_pt, keep),
+               reference_douglas_peucker(x, y, tolerance, split_pt, end, keep))
+
+def random_walk(n):
+    rng = np.random.default_rng(n)
+    return np.cumsum(rng.normal(size=n)) * 10, np.cumsum(rng.normal(size=n)) * 10
+
+def spiral(n):
+
+    #every split only peels off one point, the worst case for the level by level version
+    angle = np.linspace(0, 20 * np.pi, n)
+    return np.cos(angle) * angle * 10, np.sin(angle) * angle * 10
+
+@pytest.mark.parametrize('x, y', [random_walk(2000), spiral(500), (np.zeros(50), np.zeros(50)),
+                                  (np.arange(3.0), np.array([0.0, 5.0, 0.0]))])
+@pytest.mark.parametrize('tolerance', [0, 1, 25])
+def test_matches_recursive_douglas_peucker(x, y, tolerance):
+
+    keep = np.zeros(len(x), dtype=bool)
+    keep[[0, -1]] = True
+    deviation = reference_douglas_peucker(x, y, tolerance, 0, len(x) - 1, keep)
+
+    simplified_keep, simplified_deviation = Simplifier.douglas_peucker(x, y, tolerance)
+    assert simplified_keep.tolist() == keep.tolist()
+    assert simplified_deviation == pytest.approx(deviation)
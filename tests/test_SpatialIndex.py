@@ -0,0 +1,55 @@
+#installed packages
+import numpy as np
+import pytest
+
+#local packages
+import Geo
+import SpatialIndex
+
+def make_points(n, seed):
+
+    #a random walk of roughly 5m steps, like a hike
+    rng = np.random.default_rng(seed)
+    lat = 36.0 + np.cumsum(rng.normal(scale=5 / Geo.DEG_LAT_DIST, size=n))
+    lon = -115.0 + np.cumsum(rng.normal(scale=5 / Geo.DEG_LAT_DIST, size=n))
+    return lat, lon
+
+def brute_force_sq_dist(index, lat, lon, track_lat, track_lon):
+
+    #(query, track point) squared distances on the index's own projection
+    return Geo.flat_sq_dist(lat[:, None], track_lat[None, :], lon[:, None], track_lon[None, :], index.deg_lon_dist)
+
+@pytest.mark.parametrize('cell_size', [None, 1, 1000])
+def test_nearest_matches_brute_force(cell_size):
+
+    track_lat, track_lon = make_points(2000, 0)
+    index = SpatialIndex.SpatialIndex(track_lat, track_lon, cell_size)
+
+    #queries near the track, far outside its grid and missing
+    query_lat, query_lon = make_points(500, 1)
+    query_lat = np.r_[query_lat, 37.0, 35.5, np.nan]
+    query_lon = np.r_[query_lon, -115.0, -114.0, -115.0]
+    nearest_idx, dist = index.nearest(query_lat, query_lon)
+
+    sq_dist = brute_force_sq_dist(index, query_lat[:-1], query_lon[:-1], track_lat, track_lon)
+    assert np.allclose(dist[:-1], np.sqrt(sq_dist.min(axis=1)))
+    assert np.allclose(sq_dist[np.arange(len(sq_dist)), nearest_idx[:-1]], sq_dist.min(axis=1))
+    assert nearest_idx[-1] == -1 and np.isnan(dist[-1])
+
+def test_within_matches_brute_force():
+
+    track_lat, track_lon = make_points(2000, 2)
+    index = SpatialIndex.SpatialIndex(track_lat, track_lon)
+    query_lat, query_lon = make_points(200, 3)
+    radius = 30
+
+    query_idx, point_idx = index.within(query_lat, query_lon, radius)
+
+    sq_dist = brute_force_sq_dist(index, query_lat, query_lon, track_lat, track_lon)
+    expected_query_idx, expected_point_idx = np.nonzero(sq_dist <= radius**2)
+    assert sorted(zip(query_idx.tolist(), point_idx.tolist())) == \
+           sorted(zip(expected_query_idx.tolist(), expected_point_idx.tolist()))
+    #ordered by query, then by distance
+    pair_sq_dist = sq_dist[query_idx, point_idx]
+    assert np.all(np.diff(query_idx) >= 0)
+    assert np.all(np.diff(pair_sq_dist)[np.diff(query_idx) == 0] >= 0)
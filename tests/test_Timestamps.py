@@ -0,0 +1,52 @@
+#installed packages
+import numpy as np
+import pytest
+
+#local packages
+import Timestamps
+from Track import NAT
+
+def test_parse_iso_matches_numpy():
+
+    #random seconds from 1900 to 2100, leap days included
+    rng = np.random.default_rng(0)
+    time = rng.integers(-2208988800, 4102444800, 5000)
+    datetime_list = [datetime + 'Z' for datetime in np.datetime_as_string(time.astype('datetime64[s]')).tolist()]
+    assert Timestamps.parse_iso(datetime_list).tolist() == time.tolist()
+    assert Timestamps.parse_iso(Timestamps.format_iso(time)).tolist() == time.tolist()
+
+@pytest.mark.parametrize('datetime, time', [
+    ('2019-02-14T06:28:54.000Z', 1550125734),
+    ('2019-02-14T06:28:54.123456Z', 1550125734),
+    ('2019-02-14T06:28:54', 1550125734),
+    ('2019-02-14 06:28:54', 1550125734),
+    ('\n  2019-02-14T06:28:54Z\n', 1550125734),
+    ('2019-02-14T06:28:54+02:00', 1550125734 - 2 * 3600),
+    ('2019-02-14T06:28:54-04:30', 1550125734 + 4 * 3600 + 30 * 60),
+    ('2020-02-29T00:00:00Z', 1582934400),
+    ('2019-02-29T00:00:00Z', NAT),
+    ('2019-13-01T00:00:00Z', NAT),
+    ('2019-02-14T06:28', NAT),
+    ('2019:02:14 06:28:54', NAT),
+    ('garbage', NAT),
+    ('', NAT),
+    (None, NAT),
+])
+def test_parse_iso(datetime, time):
+    assert Timestamps.parse_iso([datetime]).tolist() == [time]
+
+def test_parse_exif():
+
+    #exif times are local, utc_zone moves them to utc. the all zero placeholder has no time
+    datetime_list = ['2019:02:14 06:28:54', '0000:00:00 00:00:00', '2019-02-14 06:28:54', None]
+    assert Timestamps.parse_exif(datetime_list, -4).tolist() == [1550125734 + 4 * 3600, NAT, NAT, NAT]
+    assert Timestamps.parse_exif(datetime_list[:1], 5.5).tolist() == [1550125734 - 5 * 3600 - 30 * 60]
+
+def test_parse_spans_batches(monkeypatch):
+
+    monkeypatch.setattr(Timestamps, 'BATCH_SIZE', 3)
+    datetime_list = ['2019-02-14T06:28:54Z', None, 'garbage', '2019-02-14T06:28:55Z', '2019-02-14T06:28:56Z']
+    assert Timestamps.parse_iso(datetime_list).tolist() == [1550125734, NAT, NAT, 1550125735, 1550125736]
+
+def test_format_iso():
+    assert Timestamps.format_iso(np.array([1550125734, NAT])) == ['2019-02-14T06:28:54.000Z', None]
@@ -0,0 +1,42 @@
+#installed packages
+import numpy as np
+
+#local packages
+from Track import Track
+
+def make_track(time, segment, extra=None):
+    n = len(time)
+    return Track(time, np.arange(n, dtype=np.float64), -np.arange(n, dtype=np.float64), extra=extra, segment=segment)
+
+def test_split_segments():
+
+    track = make_track([0, 1, 2, 10, 11, 20], [0, 0, 0, 3, 3, 7])
+    assert track.segment_starts().tolist() == [0, 3, 5, 6]
+    assert [segment.time.tolist() for segment in track.split_segments()] == [[0, 1, 2], [10, 11], [20]]
+    #segments are views, not copies
+    assert all(np.shares_memory(segment.lat, track.lat) for segment in track.split_segments())
+
+    empty_track = make_track([], [])
+    assert empty_track.segment_starts().tolist() == [0]
+    assert empty_track.split_segments() == []
+
+def test_concat_keeps_segments_apart():
+
+    #both tracks number their segments from 0, the concat keeps all four apart
+    track = Track.concat([make_track([0, 1, 2], [0, 1, 1], {'hr': np.array([60, 61, 62])}),
+                          make_track([], []),
+                          make_track([5, 6, 7], [4, 4, 5], {'hr': np.array([70, 71, 72]), 'cad': np.zeros(3)})])
+    assert track.time.tolist() == [0, 1, 2, 5, 6, 7]
+    assert [segment.time.tolist() for segment in track.split_segments()] == [[0], [1, 2], [5, 6], [7]]
+    #an extension column is only kept if every track has it, empty ones included
+    assert list(track.extra) == []
+
+    track = Track.concat([make_track([0, 1], [0, 0], {'hr': np.array([60, 61])}),
+                          make_track([2, 3], [0, 0], {'hr': np.array([62, 63])})])
+    assert track.extra['hr'].tolist() == [60, 61, 62, 63]
+    assert len(track.split_segments()) == 2
+
+def test_split_gaps():
+
+    track = make_track([0, 10, 5000, 5010, 5020], [0, 0, 0, 0, 1])
+    assert [segment.time.tolist() for segment in track.split_gaps(600).split_segments()] == [[0, 10], [5000, 5010], [5020]]
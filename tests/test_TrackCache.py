@@ -0,0 +1,61 @@
+#std packages
+import os
+
+#installed packages
+import numpy as np
+
+#local packages
+import TrackCache
+from Track import Track
+
+def make_src(tmp_path):
+    src_file = os.path.join(str(tmp_path), 'hike.gpx')
+    with open(src_file, 'w') as f:
+        f.write('<gpx></gpx>')
+    return src_file
+
+def test_round_trip(tmp_path):
+
+    src_file = make_src(tmp_path)
+    track = Track(np.array([0, 1, 2]), np.array([36.0, 36.1, 36.2]), np.array([-115.0, -115.1, -115.2]),
+                  np.array([1000.5, np.nan, 1002.0]), np.array([np.nan, 2.5, 3.0]),
+                  {'hr': np.array([60, 61, 62])}, np.array([0, 0, 1]))
+    TrackCache.store(src_file, track, TrackCache.get_key(src_file))
+
+    cached_track = TrackCache.load(src_file)
+    for col in ('time', 'lat', 'lon', 'ele', 'dop', 'segment'):
+        assert np.array_equal(getattr(cached_track, col), getattr(track, col), equal_nan=True)
+        assert getattr(cached_track, col).dtype == getattr(track, col).dtype
+    assert cached_track.extra['hr'].tolist() == [60, 61, 62]
+    #columns are memory mapped read-only
+    assert not cached_track.time.flags.writeable
+
+def test_changed_source_is_not_loaded(tmp_path):
+
+    src_file = make_src(tmp_path)
+    TrackCache.store(src_file, Track([0], [36.0], [-115.0]), TrackCache.get_key(src_file))
+    assert TrackCache.load(src_file) is not None
+
+    with open(src_file, 'a') as f:
+        f.write('\n')
+    assert TrackCache.load(src_file) is None
+
+def test_stale_key_is_not_loaded(tmp_path, monkeypatch):
+
+    #a key taken before the source changed, or of another format version, never validates
+    src_file = make_src(tmp_path)
+    key = TrackCache.get_key(src_file)
+    TrackCache.store(src_file, Track([0], [36.0], [-115.0]), dict(key, size=key['size'] + 1))
+    assert TrackCache.load(src_file) is None
+
+    TrackCache.store(src_file, Track([0], [36.0], [-115.0]), key)
+    monkeypatch.setattr(TrackCache, 'FORMAT_VERSION', TrackCache.FORMAT_VERSION + 1)
+    assert TrackCache.load(src_file) is None
+
+def test_extra_columns_of_an_earlier_store_are_dropped(tmp_path):
+
+    src_file = make_src(tmp_path)
+    key = TrackCache.get_key(src_file)
+    TrackCache.store(src_file, Track([0], [36.0], [-115.0], extra={'hr': np.array([60])}), key)
+    TrackCache.store(src_file, Track([0], [36.0], [-115.0]), key)
+    assert TrackCache.load(src_file).extra == {}